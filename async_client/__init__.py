@@ -1 +1,3 @@
 from async_client.async_client import AsyncClient
+from async_client.rate_limiter import Priority, RateLimiter
+from async_client.response_cache import CachedResponse, ResponseCache
@@ -1,14 +1,17 @@
+import asyncio
 import base64
 import json
+import random
 
 import httpx
-import requests
 import urllib.parse
 
-from asyncio_throttle import Throttler
 from http import HTTPStatus
 from typing import Optional
 
+from async_client.rate_limiter import Priority, RateLimiter
+from async_client.response_cache import CachedResponse, ResponseCache
+
 
 class AsyncClient:
     def __init__(
@@ -17,7 +20,12 @@ class AsyncClient:
             password: Optional[str] = None,
             key_name: Optional[str] = None,
             key_description: Optional[str] = None,
-            key: Optional[str] = None
+            key: Optional[str] = None,
+            rate_limit: float = 20,
+            burst_limit: int = 10,
+            endpoint_budgets: Optional[dict[str, tuple[float, int]]] = None,
+            endpoint_ttls: Optional[dict[str, float]] = None,
+            cache_directory: Optional[str] = None
     ):
         """
         An asynchronous Clash of Clans API client
@@ -28,6 +36,12 @@ class AsyncClient:
         :param key_description: description of key to be updated or created
         :param key: existing key which will be used to connect to Clash of Clans API.
             If specified, overrides previous parameters.
+        :param rate_limit: number of requests per second shared by all callers
+        :param burst_limit: number of requests that may be sent at once after an idle period
+        :param endpoint_budgets: rate and burst limits of individual endpoints, e.g. {'players': (15, 15)}
+        :param endpoint_ttls: number of seconds responses of individual endpoints are cached
+            if the API does not send Cache-Control header, e.g. {'players': 60}
+        :param cache_directory: directory where cached responses are stored, if specified
         """
         self.email = email
         self.password = password
@@ -36,118 +50,193 @@ class AsyncClient:
         self.key = key
 
         self.http_client = httpx.AsyncClient()
-        self.throttler = Throttler(rate_limit=20, period=1)
+        self.rate_limiter = RateLimiter(
+            rate=rate_limit,
+            burst=burst_limit,
+            endpoint_budgets=endpoint_budgets if endpoint_budgets is not None else {'players': (15, 15)}
+        )
+        self.response_cache = ResponseCache(
+            endpoint_ttls=endpoint_ttls if endpoint_ttls is not None else {'clans': 60, 'players': 60, 'warlog': 300},
+            directory=cache_directory
+        )
 
-        if self.email is not None and self.password is not None:
-            self.update_key()
+        self.key_update = None
 
-    def update_key(self) -> bool:
+    async def update_key(self) -> bool:
         if self.email is None or self.password is None:
             return False
-        session = requests.Session()
-        login = session.post(
+        if self.key_update is None or self.key_update.done():
+            self.key_update = asyncio.create_task(self.retrieve_key())
+        return await asyncio.shield(self.key_update)
+
+    async def retrieve_key(self) -> bool:
+        login = await self.http_client.post(
             url='https://developer.clashofclans.com/api/login',
-            json={'email': self.email, 'password': self.password}
+            json={'email': self.email, 'password': self.password},
+            timeout=60
         )
         current_ip = json.loads(
             base64.b64decode(login.json()['temporaryAPIToken'].split('.')[1] + '====').decode('utf-8')
         )['limits'][1]['cidrs'][0].split('/')[0]
-        retrieved_key_to_update = None
-        retrieved_key_list = session.post(url=f"https://developer.clashofclans.com/api/apikey/list").json()['keys']
-        for retrieved_key in retrieved_key_list:
-            if retrieved_key['name'] == self.key_name:
-                retrieved_key_to_update = retrieved_key
-                break
-        if retrieved_key_to_update is None:
-            session.post(
-                url='https://developer.clashofclans.com/api/apikey/create',
-                json={
-                    'cidrRanges': [current_ip],
-                    'description': self.key_description,
-                    'name': self.key_name,
-                    'scopes': ['clash']
-                }
-            )
-        else:
-            if current_ip in retrieved_key_to_update['cidrRanges']:
-                self.key = retrieved_key_to_update['key']
-                return True
-            else:
-                session.post(
-                    url='https://developer.clashofclans.com/api/apikey/revoke',
-                    json={'id': retrieved_key_to_update['id']}
-                )
-                session.post(
+        try:
+            retrieved_key_to_update = None
+            retrieved_key_list = (await self.http_client.post(
+                url='https://developer.clashofclans.com/api/apikey/list', timeout=60
+            )).json()['keys']
+            for retrieved_key in retrieved_key_list:
+                if retrieved_key['name'] == self.key_name:
+                    retrieved_key_to_update = retrieved_key
+                    break
+            if retrieved_key_to_update is None:
+                await self.http_client.post(
                     url='https://developer.clashofclans.com/api/apikey/create',
                     json={
-                        'cidrRanges': retrieved_key_to_update['cidrRanges'] + [current_ip],
+                        'cidrRanges': [current_ip],
                         'description': self.key_description,
                         'name': self.key_name,
                         'scopes': ['clash']
-                    }
+                    },
+                    timeout=60
                 )
-        updated_key_list = session.post(url='https://developer.clashofclans.com/api/apikey/list').json()['keys']
-        session.post(url='https://developer.clashofclans.com/api/logout')
-        self.key = None
+            else:
+                if current_ip in retrieved_key_to_update['cidrRanges']:
+                    self.key = retrieved_key_to_update['key']
+                    return True
+                else:
+                    await self.http_client.post(
+                        url='https://developer.clashofclans.com/api/apikey/revoke',
+                        json={'id': retrieved_key_to_update['id']},
+                        timeout=60
+                    )
+                    await self.http_client.post(
+                        url='https://developer.clashofclans.com/api/apikey/create',
+                        json={
+                            'cidrRanges': retrieved_key_to_update['cidrRanges'] + [current_ip],
+                            'description': self.key_description,
+                            'name': self.key_name,
+                            'scopes': ['clash']
+                        },
+                        timeout=60
+                    )
+            updated_key_list = (await self.http_client.post(
+                url='https://developer.clashofclans.com/api/apikey/list', timeout=60
+            )).json()['keys']
+        finally:
+            await self.http_client.post(url='https://developer.clashofclans.com/api/logout', timeout=60)
+            self.http_client.cookies.clear()
         for updated_key in updated_key_list:
             if updated_key['name'] == self.key_name:
                 self.key = updated_key['key']
-                break
+                return True
+        return False
+
+    async def get_data(self, url: str, endpoint: Optional[str] = None, priority: Priority = Priority.interactive):
+        cached_response = self.response_cache.get(url)
+        if cached_response is not None and cached_response.is_fresh():
+            return cached_response.data
         if self.key is None:
-            return False
-        return True
-
-    async def get_data(self, url: str):
-        async with self.throttler:
-            response = await self.http_client.get(
-                url=url,
-                headers={'authorization': f'Bearer {self.key}', 'accept': 'application/json'},
-                timeout=60
-            )
-            if response.status_code == HTTPStatus.FORBIDDEN and self.update_key():
+            await self.update_key()
+        await self.rate_limiter.acquire(priority, endpoint)
+        used_key = self.key
+        response = await self.http_client.get(
+            url=url, headers=self.get_headers(used_key, cached_response), timeout=60
+        )
+        if response.status_code == HTTPStatus.FORBIDDEN:
+            is_key_updated = self.key != used_key or await self.update_key()
+            if is_key_updated:
+                await self.rate_limiter.acquire(priority, endpoint)
                 response = await self.http_client.get(
-                    url=url,
-                    headers={'authorization': f'Bearer {self.key}', 'accept': 'application/json'},
-                    timeout=60
+                    url=url, headers=self.get_headers(self.key, cached_response), timeout=60
                 )
-            return response.json() if response.status_code == HTTPStatus.OK else None
-
-    async def get_clan(self, clan_tag: str):
+        if response.status_code == HTTPStatus.NOT_MODIFIED and cached_response is not None:
+            return self.response_cache.revalidate(url, endpoint, cached_response, response.headers).data
+        if response.status_code == HTTPStatus.OK:
+            return (await self.response_cache.store(url, endpoint, response.json(), response.headers)).data
+        return None
+
+    @staticmethod
+    def get_headers(key: str, cached_response: Optional[CachedResponse]) -> dict[str, str]:
+        headers = {'authorization': f'Bearer {key}', 'accept': 'application/json'}
+        if cached_response is not None and cached_response.etag is not None:
+            headers['if-none-match'] = cached_response.etag
+        return headers
+
+    async def get_clan(self, clan_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}'
+            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}',
+            'clans', priority
         )
 
-    async def get_clan_current_war(self, clan_tag: str):
+    async def get_clan_current_war(self, clan_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/currentwar'
+            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/currentwar',
+            'currentwar', priority
         )
 
-    async def get_clan_war_league_group(self, clan_tag: str):
+    async def get_clan_war_league_group(self, clan_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/currentwar/leaguegroup'
+            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/currentwar/leaguegroup',
+            'leaguegroup', priority
         )
 
-    async def get_clan_war_league_war(self, war_tag: str):
+    async def get_clan_war_league_war(self, war_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/clanwarleagues/wars/{urllib.parse.quote(war_tag)}'
+            f'https://api.clashofclans.com/v1/clanwarleagues/wars/{urllib.parse.quote(war_tag)}',
+            'clanwarleagues', priority
         )
 
-    async def get_clan_capital_raid_seasons(self, clan_tag: str):
+    async def get_clan_capital_raid_seasons(self, clan_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/capitalraidseasons'
+            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/capitalraidseasons',
+            'capitalraidseasons', priority
         )
 
-    async def get_clan_members(self, clan_tag: str):
+    async def get_clan_members(self, clan_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/members'
+            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/members',
+            'members', priority
         )
 
-    async def get_player(self, player_tag: str):
+    async def get_player(self, player_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/players/{urllib.parse.quote(player_tag)}'
+            f'https://api.clashofclans.com/v1/players/{urllib.parse.quote(player_tag)}',
+            'players', priority
         )
 
-    async def get_war_log(self, clan_tag: str):
+    async def get_players(
+            self,
+            player_tags: list[str],
+            priority: Priority = Priority.interactive,
+            max_concurrency: int = 10,
+            max_attempts: int = 3,
+            backoff_seconds: float = 1
+    ) -> dict[str, Optional[dict]]:
+        """
+        Retrieves players with a bounded number of requests in flight.
+        A failed request is retried after an exponential backoff with jitter,
+        players that could not be retrieved are mapped to None.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def get_player_with_retries(player_tag: str) -> Optional[dict]:
+            for attempt in range(max_attempts):
+                if attempt > 0:
+                    await asyncio.sleep(backoff_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                try:
+                    async with semaphore:
+                        player = await self.get_player(player_tag=player_tag, priority=priority)
+                except httpx.HTTPError as e:
+                    print(f'Player {player_tag} was not retrieved: {e}')
+                    continue
+                if player is not None:
+                    return player
+            return None
+
+        players = await asyncio.gather(*(get_player_with_retries(player_tag) for player_tag in player_tags))
+        return dict(zip(player_tags, players))
+
+    async def get_war_log(self, clan_tag: str, priority: Priority = Priority.interactive):
         return await self.get_data(
-            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/warlog'
+            f'https://api.clashofclans.com/v1/clans/{urllib.parse.quote(clan_tag)}/warlog',
+            'warlog', priority
         )
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+from enum import IntEnum, auto
+from typing import Optional
+
+
+class Priority(IntEnum):
+    interactive = auto()
+    alert = auto()
+    bulk = auto()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self) -> float:
+        self.refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class RateLimiter:
+    def __init__(
+            self,
+            rate: float,
+            burst: int,
+            endpoint_budgets: Optional[dict[str, tuple[float, int]]] = None
+    ):
+        """
+        A token bucket rate limiter that serves waiters in strict priority order
+
+        :param rate: number of requests per second allowed in total
+        :param burst: number of requests that may be sent at once after an idle period
+        :param endpoint_budgets: rate and burst of additional buckets for individual endpoints
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.endpoint_buckets = {
+            endpoint: TokenBucket(endpoint_rate, endpoint_burst)
+            for endpoint, (endpoint_rate, endpoint_burst) in (endpoint_budgets or {}).items()
+        }
+        self.lanes = {priority: deque() for priority in Priority}
+        self.dispatcher = None
+        self.wakeup = asyncio.Event()
+
+        self.acquired_count = {priority: 0 for priority in Priority}
+        self.total_wait_time = {priority: 0.0 for priority in Priority}
+        self.max_wait_time = {priority: 0.0 for priority in Priority}
+
+    async def acquire(self, priority: Priority, endpoint: Optional[str] = None) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self.lanes[priority].append((future, endpoint, time.monotonic()))
+        self.wakeup.set()
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self.dispatch())
+        await future
+
+    async def dispatch(self) -> None:
+        while any(self.lanes.values()):
+            global_delay = self.bucket.delay()
+            if global_delay > 0:
+                await self.sleep(global_delay)
+                continue
+            endpoint_delays = []
+            for priority, lane in self.lanes.items():
+                for waiter in list(lane):
+                    future, endpoint, enqueued_at = waiter
+                    if future.done():
+                        lane.remove(waiter)
+                        continue
+                    endpoint_bucket = self.endpoint_buckets.get(endpoint)
+                    endpoint_delay = endpoint_bucket.delay() if endpoint_bucket is not None else 0
+                    if endpoint_delay > 0:
+                        endpoint_delays.append(endpoint_delay)
+                        continue
+                    lane.remove(waiter)
+                    self.bucket.take()
+                    if endpoint_bucket is not None:
+                        endpoint_bucket.take()
+                    self.record_wait_time(priority, time.monotonic() - enqueued_at)
+                    future.set_result(None)
+                    break
+                else:
+                    continue
+                break
+            else:
+                if endpoint_delays:
+                    await self.sleep(min(endpoint_delays))
+                    continue
+            await asyncio.sleep(0)
+
+    async def sleep(self, delay: float) -> None:
+        self.wakeup.clear()
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.wakeup.wait(), delay)
+
+    def record_wait_time(self, priority: Priority, wait_time: float) -> None:
+        self.acquired_count[priority] += 1
+        self.total_wait_time[priority] += wait_time
+        self.max_wait_time[priority] = max(self.max_wait_time[priority], wait_time)
+
+    def queue_depth(self) -> dict[Priority, int]:
+        return {priority: len(lane) for priority, lane in self.lanes.items()}
+
+    def get_metrics(self) -> dict[str, dict[str, float]]:
+        return {
+            priority.name: {
+                'queue_depth': len(self.lanes[priority]),
+                'acquired': self.acquired_count[priority],
+                'average_wait_time': (
+                    self.total_wait_time[priority] / self.acquired_count[priority]
+                    if self.acquired_count[priority] > 0 else 0.0
+                ),
+                'max_wait_time': self.max_wait_time[priority]
+            }
+            for priority in Priority
+        }
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Any
+
+from httpx import Headers
+
+
+@dataclass
+class CachedResponse:
+    data: Any
+    etag: Optional[str]
+    expires_at: float
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class ResponseCache:
+    def __init__(
+            self,
+            endpoint_ttls: Optional[dict[str, float]] = None,
+            directory: Optional[str] = None,
+            max_entries: int = 10000,
+            expired_ttl_seconds: float = 24 * 60 * 60,
+            prune_interval_seconds: float = 60 * 60
+    ):
+        """
+        An LRU cache of Clash of Clans API responses.
+        Unchanged responses are returned as the same object, so callers may compare them by identity
+        to skip processing of data they have already seen. Returned data must not be modified.
+
+        :param endpoint_ttls: number of seconds a response of an endpoint is considered fresh
+            if the API does not send Cache-Control header
+        :param directory: directory where responses are stored to survive restarts
+        :param max_entries: number of responses kept in memory and on disk
+        :param expired_ttl_seconds: number of seconds an expired response is kept for revalidation
+        :param prune_interval_seconds: number of seconds between removals of old responses from disk
+        """
+        self.endpoint_ttls = endpoint_ttls or {}
+        self.directory = directory
+        self.max_entries = max_entries
+        self.expired_ttl_seconds = expired_ttl_seconds
+        self.prune_interval_seconds = prune_interval_seconds
+        self.entries = OrderedDict()
+        self.pruned_at = time.monotonic()
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        cached_response = self.entries.get(url)
+        if cached_response is None and self.directory is not None:
+            cached_response = self.load(url)
+        if cached_response is None:
+            return None
+        if self.is_outdated(cached_response):
+            self.entries.pop(url, None)
+            return None
+        self.put(url, cached_response)
+        return cached_response
+
+    async def store(self, url: str, endpoint: Optional[str], data: Any, headers: Headers) -> CachedResponse:
+        cached_response = self.entries.get(url)
+        etag = headers.get('etag')
+        expires_at = time.time() + self.get_max_age(endpoint, headers)
+        if cached_response is not None and cached_response.data == data:
+            cached_response.etag = etag or cached_response.etag
+            cached_response.expires_at = expires_at
+        else:
+            cached_response = CachedResponse(data=data, etag=etag, expires_at=expires_at)
+        self.put(url, cached_response)
+        if self.directory is not None:
+            await asyncio.to_thread(self.dump, url, cached_response)
+            if time.monotonic() - self.pruned_at >= self.prune_interval_seconds:
+                self.pruned_at = time.monotonic()
+                await asyncio.to_thread(self.prune_directory)
+        return cached_response
+
+    def put(self, url: str, cached_response: CachedResponse) -> None:
+        self.entries[url] = cached_response
+        self.entries.move_to_end(url)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def is_outdated(self, cached_response: CachedResponse) -> bool:
+        return cached_response.expires_at + self.expired_ttl_seconds < time.time()
+
+    def revalidate(
+            self, url: str, endpoint: Optional[str], cached_response: CachedResponse, headers: Headers
+    ) -> CachedResponse:
+        cached_response.expires_at = time.time() + self.get_max_age(endpoint, headers)
+        self.put(url, cached_response)
+        return cached_response
+
+    def get_max_age(self, endpoint: Optional[str], headers: Headers) -> float:
+        match = re.search(r'max-age=(\d+)', headers.get('cache-control', ''))
+        if match is not None:
+            return int(match.group(1))
+        return self.endpoint_ttls.get(endpoint, 0)
+
+    def get_path(self, url: str) -> str:
+        return os.path.join(self.directory, f'{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json')
+
+    def load(self, url: str) -> Optional[CachedResponse]:
+        try:
+            with open(self.get_path(url), mode='r', encoding='utf8') as file:
+                return CachedResponse(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def dump(self, url: str, cached_response: CachedResponse) -> None:
+        with open(self.get_path(url), mode='w', encoding='utf8') as file:
+            json.dump(
+                {'data': cached_response.data, 'etag': cached_response.etag, 'expires_at': cached_response.expires_at},
+                file
+            )
+
+    def prune_directory(self) -> None:
+        paths = []
+        for file_name in os.listdir(self.directory):
+            path = os.path.join(self.directory, file_name)
+            try:
+                paths.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        paths.sort(reverse=True)
+        outdated_before = time.time() - self.expired_ttl_seconds
+        for number, (modified_at, path) in enumerate(paths):
+            if number >= self.max_entries or modified_at < outdated_before:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
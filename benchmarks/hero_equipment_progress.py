@@ -0,0 +1,113 @@
+import math
+import random
+import timeit
+
+from entities.game_entities import HeroEquipment
+from output_formatter import OutputFormatter
+from output_formatter.hero_equipment_progress import HeroEquipmentProgress
+
+PLAYERS_COUNT = 50
+REPEATS = 200
+
+
+def calculate_per_player(hero_equipments: list[dict]) -> tuple[float, float, float, float]:
+    """
+    Hero equipment progress of a player as it was computed before HeroEquipmentProgress,
+    with available equipment, totals and cumulative prices rebuilt for every player
+    """
+    available_hero_equipments = OutputFormatter.get_available_hero_equipments()
+    regular_equipment_max_level = 18
+    epic_equipment_max_level = 27
+    regular_equipment_amount = sum(
+        hero_equipment.max_level == regular_equipment_max_level
+        for hero_equipment in available_hero_equipments.values()
+    )
+    epic_equipment_amount = sum(
+        hero_equipment.max_level == epic_equipment_max_level
+        for hero_equipment in available_hero_equipments.values()
+    )
+    shiny_ore_cumulative_price = list(HeroEquipmentProgress.SHINY_ORE_CUMULATIVE_PRICE)
+    glowy_ore_cumulative_price = list(HeroEquipmentProgress.GLOWY_ORE_CUMULATIVE_PRICE)
+    starry_ore_cumulative_price = list(HeroEquipmentProgress.STARRY_ORE_CUMULATIVE_PRICE)
+    shiny_ore_amount = 0
+    glowy_ore_amount = 0
+    starry_ore_amount = 0
+    levels_amount = 0
+    total_shiny_ore_amount = (
+            shiny_ore_cumulative_price[regular_equipment_max_level - 1] * regular_equipment_amount +
+            shiny_ore_cumulative_price[epic_equipment_max_level - 1] * epic_equipment_amount
+    )
+    total_glowy_ore_amount = (
+            glowy_ore_cumulative_price[regular_equipment_max_level - 1] * regular_equipment_amount +
+            glowy_ore_cumulative_price[epic_equipment_max_level - 1] * epic_equipment_amount
+    )
+    total_starry_ore_amount = starry_ore_cumulative_price[epic_equipment_max_level - 1] * epic_equipment_amount
+    total_levels_amount = (
+            regular_equipment_max_level * regular_equipment_amount +
+            epic_equipment_max_level * epic_equipment_amount
+    )
+    for hero_equipment in hero_equipments:
+        if hero_equipment['name'] in available_hero_equipments:
+            shiny_ore_amount += shiny_ore_cumulative_price[hero_equipment['level'] - 1]
+            glowy_ore_amount += glowy_ore_cumulative_price[hero_equipment['level'] - 1]
+            if hero_equipment['maxLevel'] == 27:
+                starry_ore_amount += starry_ore_cumulative_price[hero_equipment['level'] - 1]
+            levels_amount += hero_equipment['level']
+    return (
+        shiny_ore_amount / total_shiny_ore_amount,
+        glowy_ore_amount / total_glowy_ore_amount,
+        starry_ore_amount / total_starry_ore_amount,
+        levels_amount / total_levels_amount
+    )
+
+
+def generate_players(available_hero_equipments: dict[str, HeroEquipment]) -> dict[str, list[dict]]:
+    generator = random.Random(0)
+    players = {}
+    for player_number in range(PLAYERS_COUNT):
+        players[f'#{player_number}'] = [
+            {
+                'name': name,
+                'level': generator.randint(1, hero_equipment.max_level),
+                'maxLevel': hero_equipment.max_level
+            }
+            for name, hero_equipment in available_hero_equipments.items()
+            if generator.random() < 0.8
+        ] + [{'name': 'Unknown Equipment', 'level': 1, 'maxLevel': 18}]
+    return players
+
+
+def main() -> None:
+    available_hero_equipments = OutputFormatter.get_available_hero_equipments()
+    hero_equipment_progress = HeroEquipmentProgress(available_hero_equipments)
+    players = generate_players(available_hero_equipments)
+
+    def calculate_clan_per_player() -> dict[str, tuple[float, float, float, float]]:
+        return {
+            player_tag: calculate_per_player(hero_equipments)
+            for player_tag, hero_equipments in players.items()
+        }
+
+    def calculate_clan_precomputed() -> dict[str, tuple[float, float, float, float]]:
+        return {
+            player_tag: hero_equipment_progress.calculate_percentages(hero_equipments)
+            for player_tag, hero_equipments in players.items()
+        }
+
+    per_player_progress = calculate_clan_per_player()
+    precomputed_progress = calculate_clan_precomputed()
+    for player_tag, progress in per_player_progress.items():
+        assert all(
+            math.isclose(amount, precomputed_amount)
+            for amount, precomputed_amount in zip(progress, precomputed_progress[player_tag])
+        ), player_tag
+
+    per_player_seconds = timeit.timeit(calculate_clan_per_player, number=REPEATS) / REPEATS
+    precomputed_seconds = timeit.timeit(calculate_clan_precomputed, number=REPEATS) / REPEATS
+    print(f'Players: {PLAYERS_COUNT}, results match')
+    print(f'Per player: {per_player_seconds * 1e6:.0f} µs per clan')
+    print(f'Precomputed: {precomputed_seconds * 1e6:.0f} µs per clan')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,53 @@
 import logging
 import datetime
+import random
 from datetime import UTC
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
 from aiogram.enums import ParseMode, ChatType
 from aiogram.types import TelegramObject, Message, CallbackQuery
 
 from bot.commands import bot_cmd_list
+from config import config
 from database_manager import DatabaseManager
 
+logger = logging.getLogger(__name__)
+
+
+class LazyAttributes:
+    __slots__ = ('get_attributes', 'telegram_object')
+
+    def __init__(self, get_attributes: Callable[[Any], str], telegram_object: Any):
+        self.get_attributes = get_attributes
+        self.telegram_object = telegram_object
+
+    def __str__(self) -> str:
+        return self.get_attributes(self.telegram_object)
+
+
+class DatabaseManagerMiddleware(BaseMiddleware):
+    def __init__(self, dms: dict[int, DatabaseManager]):
+        self.dms = dms
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            update: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        data['dm'] = self.dms[data['bot'].id]
+        return await handler(update, data)
+
 
 class MessageMiddleware(BaseMiddleware):
-    def __init__(self):
-        pass
+    def __init__(self, not_propagated_sample_rate: Optional[float] = None):
+        """
+        :param not_propagated_sample_rate: share of messages that were not propagated which are logged
+        """
+        if not_propagated_sample_rate is None:
+            not_propagated_sample_rate = float(config.not_propagated_log_sample_rate.get_secret_value())
+        self.not_propagated_sample_rate = not_propagated_sample_rate
 
     async def __call__(
             self,
@@ -22,11 +56,9 @@ class MessageMiddleware(BaseMiddleware):
             data: Dict[str, Any]
     ) -> Any:
         dm: DatabaseManager = data['dm']
-        clan_name = await dm.get_clan_name()
-        bot_username = (await dm.bot.me()).username
-        message_info = MessageMiddleware.get_message_attributes(message)
+        metadata = await dm.get_middleware_metadata()
         if message.from_user.id in dm.blocked_user_ids:
-            logging.info(f'Message {{{message_info}}} was not propagated')
+            self.log_message(message, is_propagated=False)
             return None
 
         if message.chat.type in [ChatType.PRIVATE, ChatType.GROUP, ChatType.SUPERGROUP]:
@@ -46,51 +78,63 @@ class MessageMiddleware(BaseMiddleware):
                 if entity.type == 'bot_command'
             ]
             if len(bot_commands) == 0:
-                logging.info(f'Message {{{message_info}}} was not propagated')
+                self.log_message(message, is_propagated=False)
                 return None
             else:
                 first_command = message.text[bot_commands[0].offset:bot_commands[0].offset + bot_commands[0].length]
                 acceptable_commands = [bot_cmd.command for bot_cmd in bot_cmd_list]
-                if self.is_command_for_bot(first_command, bot_username) and not message.forward_origin:
+                if self.is_command_for_bot(first_command, metadata.bot_username) and not message.forward_origin:
                     if self.is_command_valid(first_command, ['start', 'help']):
-                        logging.info(f'Message {{{message_info}}} was propagated')
+                        self.log_message(message, is_propagated=True)
                         return await handler(message, data)
                     elif self.is_command_valid(first_command, acceptable_commands):
                         if message.chat.type in [ChatType.GROUP, ChatType.SUPERGROUP]:
-                            if message.chat.id in await dm.get_chats_linked_to_clan() or not dm.is_privacy_mode_enabled:
-                                logging.info(f'Message {{{message_info}}} was propagated')
+                            if message.chat.id in metadata.linked_chat_ids or not metadata.is_privacy_mode_enabled:
+                                self.log_message(message, is_propagated=True)
                                 return await handler(message, data)
                             else:
                                 await message.reply(
-                                    text=f'Группа не привязана к клану {dm.of.to_html(clan_name)}',
+                                    text=f'Группа не привязана к клану {dm.of.to_html(metadata.clan_name)}',
                                     parse_mode=ParseMode.HTML
                                 )
-                                logging.info(f'Message {{{message_info}}} was not propagated')
+                                self.log_message(message, is_propagated=False)
                                 return None
                         elif message.chat.type == ChatType.PRIVATE:
-                            if await dm.can_user_use_bot(message.from_user.id) or not dm.is_privacy_mode_enabled:
-                                logging.info(f'Message {{{message_info}}} was propagated')
+                            if not metadata.is_privacy_mode_enabled or await dm.can_user_use_bot(message.from_user.id):
+                                self.log_message(message, is_propagated=True)
                                 return await handler(message, data)
                             else:
                                 await message.reply(
-                                    text=f'Вы не состоите в группе клана {dm.of.to_html(clan_name)}',
+                                    text=f'Вы не состоите в группе клана {dm.of.to_html(metadata.clan_name)}',
                                     parse_mode=ParseMode.HTML
                                 )
-                                logging.info(f'Message {{{message_info}}} was not propagated')
+                                self.log_message(message, is_propagated=False)
                                 return None
                         else:
-                            logging.info(f'Message {{{message_info}}} was not propagated')
+                            self.log_message(message, is_propagated=False)
                             return None
                     else:
                         await message.reply(text=f'Такой команды нет', parse_mode=ParseMode.HTML)
-                        logging.info(f'Message {{{message_info}}} was not propagated')
+                        self.log_message(message, is_propagated=False)
                         return None
                 else:
-                    logging.info(f'Message {{{message_info}}} was not propagated')
+                    self.log_message(message, is_propagated=False)
                     return None
         else:
-            logging.info(f'Message {{{message_info}}} was not propagated')
+            self.log_message(message, is_propagated=False)
+            return
+
+    def log_message(self, message: Message, is_propagated: bool) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        if not is_propagated and random.random() >= self.not_propagated_sample_rate:
             return
+        logger.info(
+            'Message {%s} was %s',
+            LazyAttributes(MessageMiddleware.get_message_attributes, message),
+            'propagated' if is_propagated else 'not propagated',
+            extra={'chat_id': message.chat.id, 'user_id': message.from_user.id, 'is_propagated': is_propagated}
+        )
 
     @staticmethod
     def get_message_attributes(message: Message) -> str:
@@ -140,15 +184,29 @@ class CallbackQueryMiddleware(BaseMiddleware):
             callback_query: CallbackQuery,
             data: Dict[str, Any]
     ) -> Any:
-        callback_query_info = CallbackQueryMiddleware.get_callback_query_attributes(callback_query)
         if (datetime.datetime.now(UTC) - callback_query.message.date).days >= 1:
             await callback_query.answer('Сообщение устарело')
-            logging.info(f'CallbackQuery {{{callback_query_info}}} was not propagated')
+            self.log_callback_query(callback_query, is_propagated=False)
             return
         else:
-            logging.info(f'CallbackQuery {{{callback_query_info}}} was propagated')
+            self.log_callback_query(callback_query, is_propagated=True)
             return await handler(callback_query, data)
 
+    @staticmethod
+    def log_callback_query(callback_query: CallbackQuery, is_propagated: bool) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(
+            'CallbackQuery {%s} was %s',
+            LazyAttributes(CallbackQueryMiddleware.get_callback_query_attributes, callback_query),
+            'propagated' if is_propagated else 'not propagated',
+            extra={
+                'chat_id': callback_query.message.chat.id,
+                'user_id': callback_query.from_user.id,
+                'is_propagated': is_propagated
+            }
+        )
+
     @staticmethod
     def get_callback_query_attributes(callback_query: CallbackQuery) -> str:
         callback_query_info = []
@@ -36,7 +36,10 @@ async def main():
     await dm.start_scheduler(bot_number)
 
     await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await dm.close()
 
 
 if __name__ == '__main__':
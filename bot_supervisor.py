@@ -0,0 +1,60 @@
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from bot.middlewares import DatabaseManagerMiddleware, MessageMiddleware, CallbackQueryMiddleware
+from config import config
+from database_manager import DatabaseManager
+from database_manager.snapshot_invalidation_listener import SnapshotInvalidationListener
+from routers import admin, cw, cwl, miscellaneous, raids
+
+
+async def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(filename)s:%(lineno)d #%(levelname)s [%(asctime)s] - %(name)s - %(message)s',
+        handlers=[logging.FileHandler('bot_supervisor.log', 'w'), logging.StreamHandler()]
+    )
+
+    api_client = DatabaseManager.create_api_client()
+    connection_pool = await DatabaseManager.create_pool(bots_count=len(config.clan_tags))
+    snapshot_invalidation_listener = SnapshotInvalidationListener(DatabaseManager.get_connection_parameters())
+    await snapshot_invalidation_listener.start()
+    scheduler = AsyncIOScheduler()
+
+    bots = []
+    dms = {}
+    for bot_number, (clan_tag, token) in enumerate(zip(config.clan_tags, config.telegram_bot_api_tokens)):
+        bot = Bot(token=token.get_secret_value())
+        dm = DatabaseManager(clan_tag=clan_tag.get_secret_value(), bot=bot, api_client=api_client)
+        await dm.connect_to_pool(connection_pool, snapshot_invalidation_listener)
+        await dm.infrequent_jobs()
+        await dm.start_scheduler(bot_number, scheduler)
+        bots.append(bot)
+        dms[bot.id] = dm
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(DatabaseManagerMiddleware(dms))
+    dp.message.outer_middleware(MessageMiddleware())
+    dp.callback_query.outer_middleware(CallbackQueryMiddleware())
+    dp.include_routers(cw.router, raids.router, cwl.router, miscellaneous.router, admin.router)
+
+    for bot in bots:
+        await bot.delete_webhook(drop_pending_updates=True)
+    try:
+        await dp.start_polling(*bots)
+    finally:
+        for dm in dms.values():
+            await dm.close()
+        await snapshot_invalidation_listener.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logging.info('KeyboardInterrupt')
+    except SystemExit:
+        logging.info('SystemExit')
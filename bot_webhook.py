@@ -32,8 +32,9 @@ async def on_startup(bot: Bot, webhook_url: str, dm: DatabaseManager, bot_number
 
 
 @router.shutdown()
-async def on_shutdown(bot: Bot):
+async def on_shutdown(bot: Bot, dm: DatabaseManager):
     await bot.delete_webhook()
+    await dm.close()
 
 
 def main():
@@ -19,10 +19,16 @@ class Settings(BaseSettings):
     postgres_schema: SecretStr
     postgres_user: SecretStr
     postgres_password: SecretStr
+    postgres_pool_size_per_bot: SecretStr = SecretStr('10')
 
     frequent_jobs_frequency_minutes: SecretStr
     infrequent_jobs_frequency_minutes: SecretStr
     job_timespan_seconds: SecretStr
+    member_updates_debounce_seconds: SecretStr = SecretStr('0')
+    not_propagated_log_sample_rate: SecretStr = SecretStr('1')
+    player_history_retention_days: SecretStr = SecretStr('365')
+    player_history_downsample_after_days: SecretStr = SecretStr('30')
+    player_refresh_minutes: SecretStr = SecretStr('60')
 
     webhook_host: SecretStr
     webhook_path: SecretStr
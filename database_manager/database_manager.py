@@ -1,23 +1,35 @@
 import asyncio
+import hashlib
 import json
+import uuid
+from collections import deque, OrderedDict
+from contextlib import suppress
 from datetime import datetime, UTC
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Awaitable
 
 import asyncpg
 import psutil
 from aiogram import Bot
 from aiogram.enums import ChatType, ParseMode
-from aiogram.types import Chat, User, Message, BotCommandScopeAllGroupChats, BotCommandScopeAllPrivateChats
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Chat, User, Message, BotCommandScopeAllGroupChats, BotCommandScopeAllPrivateChats, InlineKeyboardMarkup
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from asyncpg import Record, Pool
+from asyncpg import Record, Pool, Connection
 from psutil._common import bytes2human
 
-from async_client import AsyncClient
+from async_client import AsyncClient, Priority
 from bot.commands import bot_cmd_list, get_shown_bot_commands
 from config import config
-from entities import ClanWarLeagueWar, BotUser, RaidsMember, WarMember
+from database_manager.outbound_queue import OutboundQueue
+from database_manager.permission_service import PermissionService
+from database_manager.player_history import PlayerHistory
+from database_manager.player_refresh_scheduler import PlayerRefreshScheduler
+from database_manager.snapshot_invalidation_listener import SnapshotInvalidationListener
+from database_manager.snapshot_store import SnapshotStore
+from database_manager.write_behind_buffer import WriteBehindBuffer
+from entities import ClanWarLeagueWar, BotUser, RaidsMember, WarMember, WarView, OutboundMessage, MiddlewareMetadata
 from entities.game_entities import CWLWPlayerRating, CWLPlayerRating, CWLRatingConfig
-from output_formatter import OutputFormatter
+from output_formatter import OutputFormatter, RenderCache
 
 
 class AcquiredConnection:
@@ -49,13 +61,10 @@ class AcquiredConnection:
 
 
 class DatabaseManager:
-    def __init__(self, clan_tag: str, bot: Bot):
-        self.api_client = AsyncClient(
-            email=config.clash_of_clans_api_login.get_secret_value(),
-            password=config.clash_of_clans_api_password.get_secret_value(),
-            key_name=config.clash_of_clans_api_key_name.get_secret_value(),
-            key_description=config.clash_of_clans_api_key_description.get_secret_value()
-        )
+    def __init__(self, clan_tag: str, bot: Bot, api_client: Optional[AsyncClient] = None):
+        if api_client is None:
+            api_client = self.create_api_client()
+        self.api_client = api_client
         self.of = OutputFormatter()
 
         self.connection_pool = None
@@ -78,24 +87,153 @@ class DatabaseManager:
         self.full_name_and_username = None
 
         self.is_privacy_mode_enabled = None
-        self.blocked_user_ids = None
-        self.ingore_updates_player_tags = None
+        self.blocked_user_ids = frozenset()
+        self.ingore_updates_player_tags = frozenset()
+        self.middleware_metadata = None
 
         self.cwl_rating_config = None
+        self.were_clan_war_league_war_ratings_dumped = False
+        self.were_hero_equipment_ore_costs_dumped = False
+        self.hero_equipment_levels = None
+
+        self.dumped_responses = {}
+        self.fingerprints = {}
+
+        self.snapshots = SnapshotStore()
+        self.war_views = deque(maxlen=16)
+        self.render_cache = RenderCache(ttl_seconds=self.frequent_jobs_frequency_minutes * 60)
+        self.rendered_hashes = OrderedDict()
+        self.message_owners = OrderedDict()
+        self.instance_id = uuid.uuid4().hex
+        self.snapshot_invalidation_listener = None
+        self.is_snapshot_invalidation_listener_owned = False
+        self.outbound_queue = None
+        self.write_behind_buffer = None
+        self.permission_service = None
+
+        self.member_updates_debounce_seconds = int(config.member_updates_debounce_seconds.get_secret_value())
+        self.pending_member_updates = {}
+        self.pending_member_payloads = {}
+        self.unretrieved_clan_members = {}
+        self.member_updates_flush = None
+        self.clan_members_count = None
 
-    async def connect_to_pool(self) -> None:
-        self.connection_pool = await asyncpg.create_pool(
-            host=config.postgres_host.get_secret_value(),
-            database=config.postgres_database.get_secret_value(),
-            user=config.postgres_user.get_secret_value(),
-            password=config.postgres_password.get_secret_value(),
-            server_settings={'search_path': config.postgres_schema.get_secret_value()}
+    @staticmethod
+    def create_api_client() -> AsyncClient:
+        return AsyncClient(
+            email=config.clash_of_clans_api_login.get_secret_value(),
+            password=config.clash_of_clans_api_password.get_secret_value(),
+            key_name=config.clash_of_clans_api_key_name.get_secret_value(),
+            key_description=config.clash_of_clans_api_key_description.get_secret_value()
+        )
+
+    @staticmethod
+    def get_connection_parameters() -> dict[str, Any]:
+        return {
+            'host': config.postgres_host.get_secret_value(),
+            'database': config.postgres_database.get_secret_value(),
+            'user': config.postgres_user.get_secret_value(),
+            'password': config.postgres_password.get_secret_value(),
+            'server_settings': {'search_path': config.postgres_schema.get_secret_value()}
+        }
+
+    @staticmethod
+    async def create_pool(bots_count: int = 1) -> Pool:
+        pool_size = int(config.postgres_pool_size_per_bot.get_secret_value()) * bots_count
+        return await asyncpg.create_pool(
+            **DatabaseManager.get_connection_parameters(),
+            min_size=min(bots_count, pool_size),
+            max_size=pool_size,
+            init=DatabaseManager.init_connection
         )
+
+    @staticmethod
+    async def init_connection(connection: Connection) -> None:
+        await connection.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+    def is_response_dumped(self, key: Any, response: Any) -> bool:
+        return self.dumped_responses.get(key) is response
+
+    @staticmethod
+    def get_fingerprint(data: Any) -> str:
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+
+    async def connect_to_pool(
+            self,
+            connection_pool: Optional[Pool] = None,
+            snapshot_invalidation_listener: Optional[SnapshotInvalidationListener] = None
+    ) -> None:
+        if connection_pool is None:
+            connection_pool = await self.create_pool()
+        self.connection_pool = connection_pool
         self.acquired_connection = AcquiredConnection(self.connection_pool)
+        await self.listen_to_snapshot_invalidations(snapshot_invalidation_listener)
+        self.outbound_queue = OutboundQueue(
+            bot=self.bot,
+            acquired_connection=self.acquired_connection,
+            clan_tag=self.clan_tag,
+            on_sent=self.log_sent_message
+        )
+        await self.outbound_queue.start()
+        self.write_behind_buffer = WriteBehindBuffer(
+            acquired_connection=self.acquired_connection,
+            clan_tag=self.clan_tag,
+            flush_interval_seconds=self.frequent_jobs_frequency_minutes * 60
+        )
+        self.permission_service = PermissionService(
+            acquired_connection=self.acquired_connection,
+            clan_tag=self.clan_tag,
+            ttl_seconds=self.frequent_jobs_frequency_minutes * 60
+        )
+        self.player_history = PlayerHistory(
+            acquired_connection=self.acquired_connection,
+            clan_tag=self.clan_tag,
+            retention_days=int(config.player_history_retention_days.get_secret_value()),
+            downsample_after_days=int(config.player_history_downsample_after_days.get_secret_value())
+        )
+        await self.player_history.create_partitions()
+        self.player_refresh_scheduler = PlayerRefreshScheduler(
+            acquired_connection=self.acquired_connection,
+            clan_tag=self.clan_tag,
+            tick_seconds=self.infrequent_jobs_frequency_minutes * 60,
+            member_refresh_seconds=int(config.player_refresh_minutes.get_secret_value()) * 60
+        )
+        await self.backfill_player_hero_equipments()
+
+    async def close(self) -> None:
+        await self.write_behind_buffer.flush()
+        if self.is_snapshot_invalidation_listener_owned:
+            await self.snapshot_invalidation_listener.close()
+
+    async def listen_to_snapshot_invalidations(
+            self, snapshot_invalidation_listener: Optional[SnapshotInvalidationListener] = None
+    ) -> None:
+        self.is_snapshot_invalidation_listener_owned = snapshot_invalidation_listener is None
+        if snapshot_invalidation_listener is None:
+            snapshot_invalidation_listener = SnapshotInvalidationListener(self.get_connection_parameters())
+            await snapshot_invalidation_listener.start()
+        self.snapshot_invalidation_listener = snapshot_invalidation_listener
+        self.snapshot_invalidation_listener.subscribe(
+            self.clan_tag, self.on_snapshot_invalidation, self.snapshots.invalidate_all
+        )
 
-    async def start_scheduler(self, bot_number: int) -> None:
+    def on_snapshot_invalidation(self, invalidation: dict) -> None:
+        if invalidation['instance_id'] != self.instance_id:
+            self.snapshots.invalidate(*invalidation['names'])
+
+    async def invalidate_snapshots(self, *names: str) -> None:
+        self.snapshots.invalidate(*names)
+        await self.acquired_connection.execute('''
+            SELECT pg_notify('snapshot_invalidation', $1)
+        ''', json.dumps({'instance_id': self.instance_id, 'clan_tag': self.clan_tag, 'names': names}))
+
+    async def start_scheduler(self, bot_number: int, scheduler: Optional[AsyncIOScheduler] = None) -> None:
         SECONDS_IN_MINUTE = 60
-        self.scheduler = AsyncIOScheduler()
+        if scheduler is None:
+            scheduler = AsyncIOScheduler()
+        self.scheduler = scheduler
         infrequent_jobs_minutes = [
             minute * self.infrequent_jobs_frequency_minutes
             for minute in range(0, SECONDS_IN_MINUTE // self.infrequent_jobs_frequency_minutes)
@@ -119,9 +257,11 @@ class DatabaseManager:
             minute=infrequent_jobs_minutes_str,
             second=str(bot_number * self.job_timespan_seconds)
         )
-        self.scheduler.start()
+        if not self.scheduler.running:
+            self.scheduler.start()
 
     async def frequent_jobs(self) -> None:
+        await self.write_behind_buffer.flush()
         were_clan_members_dumped = await self.check_clan_members()
         if not were_clan_members_dumped:
             await self.load_and_cache_names()
@@ -132,6 +272,8 @@ class DatabaseManager:
         await self.dump_clan_war_league()
         await self.dump_clan_war_league_wars()
         self.print_ram_usage()
+        self.print_api_client_usage()
+        self.print_outbound_queue_usage()
 
     async def infrequent_jobs(self) -> None:
         await self.load_privacy_mode()
@@ -139,13 +281,16 @@ class DatabaseManager:
         await self.load_blocked_users()
         await self.load_ingore_updates_players()
         await self.dump_clan()
+        await self.load_middleware_metadata()
         were_clan_members_dumped = await self.check_clan_members()
         old_contributions = await self.load_capital_contributions()
         if not were_clan_members_dumped:
-            await self.dump_clan_members()
+            await self.refresh_clan_members()
             await self.load_and_cache_names()
         new_contributions = await self.load_capital_contributions()
         await self.dump_capital_contributions(old_contributions, new_contributions)
+        await self.delete_old_message_owners()
+        await self.player_history.maintain()
         await self.dump_clan_games()
         await self.dump_clan_war()
         await self.dump_raid_weekends()
@@ -153,6 +298,8 @@ class DatabaseManager:
         await self.dump_clan_war_league_wars()
         await self.load_clan_war_league_rating_config()
         self.print_ram_usage()
+        self.print_api_client_usage()
+        self.print_outbound_queue_usage()
 
     @staticmethod
     def print_ram_usage() -> None:
@@ -165,6 +312,19 @@ class DatabaseManager:
         )
         print(f'RAM used by process: {bytes2human(process.memory_info().rss)}')
 
+    def print_outbound_queue_usage(self) -> None:
+        print(f'Outbound messages queued: {self.outbound_queue.queue_depth()}')
+
+    def print_api_client_usage(self) -> None:
+        for priority_name, metrics in self.api_client.rate_limiter.get_metrics().items():
+            print(
+                f'API requests ({priority_name}): '
+                f'queued: {metrics['queue_depth']}, '
+                f'sent: {metrics['acquired']}, '
+                f'average wait: {metrics['average_wait_time']:.3f} s, '
+                f'max wait: {metrics['max_wait_time']:.3f} s'
+            )
+
     async def load_privacy_mode(self) -> bool:
         self.is_privacy_mode_enabled = await self.acquired_connection.fetchval('''
             SELECT privacy_mode_enabled
@@ -173,6 +333,28 @@ class DatabaseManager:
         ''', self.clan_tag)
         return True
 
+    async def load_middleware_metadata(self) -> MiddlewareMetadata:
+        row = await self.acquired_connection.fetchrow('''
+            SELECT
+                clan_name, privacy_mode_enabled,
+                (SELECT array_agg(chat_id) FROM clan_chat WHERE clan_chat.clan_tag = clan.clan_tag) AS linked_chat_ids
+            FROM clan
+            WHERE clan_tag = $1
+        ''', self.clan_tag)
+        self.middleware_metadata = MiddlewareMetadata(
+            bot_username=(await self.bot.me()).username,
+            clan_name=row['clan_name'],
+            linked_chat_ids=frozenset(row['linked_chat_ids'] or []),
+            is_privacy_mode_enabled=row['privacy_mode_enabled']
+        )
+        self.permission_service.invalidate()
+        return self.middleware_metadata
+
+    async def get_middleware_metadata(self) -> MiddlewareMetadata:
+        if self.middleware_metadata is None:
+            return await self.load_middleware_metadata()
+        return self.middleware_metadata
+
     async def set_actual_commands(self) -> bool:
         cw = await self.load_clan_war()
         cw_start_time = self.of.to_datetime(cw['startTime']) if cw else datetime.min
@@ -216,7 +398,7 @@ class DatabaseManager:
             FROM blocked_bot_user
             WHERE clan_tag = $1 OR clan_tag IS NULL
         ''', self.clan_tag)
-        self.blocked_user_ids = [row['user_id'] for row in rows]
+        self.blocked_user_ids = frozenset(row['user_id'] for row in rows)
 
     async def load_ingore_updates_players(self) -> None:
         rows = await self.acquired_connection.fetch('''
@@ -224,11 +406,13 @@ class DatabaseManager:
             FROM ingore_updates_player
             WHERE clan_tag = $1
         ''', self.clan_tag)
-        self.ingore_updates_player_tags = [row['player_tag'] for row in rows]
+        self.ingore_updates_player_tags = frozenset(row['player_tag'] for row in rows)
 
     async def check_clan_members(self) -> bool:
         were_clan_members_dumped = False
-        retrieved_clan_members = await self.api_client.get_clan_members(clan_tag=self.clan_tag)
+        retrieved_clan_members = await self.api_client.get_clan_members(
+            clan_tag=self.clan_tag, priority=Priority.alert
+        )
         if retrieved_clan_members is None:
             return False
         rows = await self.acquired_connection.fetch('''
@@ -237,16 +421,22 @@ class DatabaseManager:
             WHERE player.clan_tag = $1 AND is_player_in_clan
         ''', self.clan_tag)
         loaded_clan_member_tags = [row['player_tag'] for row in rows]
+        loaded_clan_member_tag_set = set(loaded_clan_member_tags)
+        loaded_clan_member_tags += [
+            player_tag for player_tag in self.unretrieved_clan_members if player_tag not in loaded_clan_member_tag_set
+        ]
+        loaded_clan_member_tag_set.update(self.unretrieved_clan_members)
         retrieved_clan_member_tags = [clan_member['tag'] for clan_member in retrieved_clan_members['items']]
+        retrieved_clan_member_tag_set = set(retrieved_clan_member_tags)
         joined_clan_member_tags = [
             clan_member_tag
             for clan_member_tag in retrieved_clan_member_tags
-            if clan_member_tag not in loaded_clan_member_tags
+            if clan_member_tag not in loaded_clan_member_tag_set
         ]
         left_clan_member_tags = [
             clan_member_tag
             for clan_member_tag in loaded_clan_member_tags
-            if clan_member_tag not in retrieved_clan_member_tags
+            if clan_member_tag not in retrieved_clan_member_tag_set
         ]
         not_ignored_player_tags = [
             player_tag
@@ -255,64 +445,123 @@ class DatabaseManager:
         ]
         if left_clan_member_tags + joined_clan_member_tags:
             were_clan_members_dumped = True
-            await self.dump_clan_members()
+            await self.dump_clan_members(joined_clan_member_tags)
             await self.load_and_cache_names()
         if len(not_ignored_player_tags) > 0:
-            rows = await self.acquired_connection.fetch('''
-                SELECT chat_id
-                FROM clan_chat
-                WHERE clan_tag = $1 AND send_member_updates
-            ''', self.clan_tag)
-            chat_ids = [row['chat_id'] for row in rows]
-            for chat_id in chat_ids:
-                for clan_member_tag in not_ignored_player_tags:
-                    rows = await self.acquired_connection.fetch('''
-                        SELECT user_id
-                        FROM
-                            player
-                            JOIN player_bot_user USING (clan_tag, player_tag)
-                            JOIN bot_user USING (clan_tag, chat_id, user_id)
-                        WHERE clan_tag = $1 AND player_tag = $2 AND chat_id = $3 AND is_user_in_chat
-                    ''', self.clan_tag, clan_member_tag, chat_id)
-                    user_ids = [row['user_id'] for row in rows]
-                    mentions = ''
-                    if len(user_ids) > 0:
-                        mentions += f' ({', '.join(
-                            '👤 ' + self.of.to_html(self.load_full_name(chat_id, user_id)) for user_id in user_ids
-                        )})'
-                    row = await self.acquired_connection.fetchrow('''
-                        SELECT
-                            town_hall_level, barbarian_king_level, archer_queen_level,
-                            minion_prince_level, grand_warden_level, royal_champion_level, dragon_duke_level
-                        FROM player
-                        WHERE clan_tag = $1 AND player_tag = $2
-                    ''', self.clan_tag, clan_member_tag)
-                    message_text = (
-                        f'<b>{self.of.to_html(self.load_name(clan_member_tag))}</b> '
-                        f'{self.of.get_player_info_with_custom_emoji(
-                            row['town_hall_level'],
-                            row['barbarian_king_level'],
-                            row['archer_queen_level'],
-                            row['minion_prince_level'],
-                            row['grand_warden_level'],
-                            row['royal_champion_level'],
-                            row['dragon_duke_level']
-                        )}{mentions} ')
-                    if clan_member_tag in left_clan_member_tags:
-                        message_text += f'покинул клан'
-                    elif clan_member_tag in joined_clan_member_tags:
-                        message_text += f'вступил в клан'
-                    message_text += f' ({len(retrieved_clan_members['items'])} / 50 🪖)'
-                    await self.send_message_to_chat(
-                        user_id=None,
-                        chat_id=chat_id,
-                        message_text=message_text,
-                        user_ids_to_ping=None
-                    )
+            for player_tag in not_ignored_player_tags:
+                previous_update = self.pending_member_updates.pop(player_tag, None)
+                update = 'joined' if player_tag in retrieved_clan_member_tag_set else 'left'
+                if previous_update is None or previous_update == update:
+                    self.pending_member_updates[player_tag] = update
+            self.pending_member_payloads.update(
+                (clan_member['tag'], clan_member)
+                for clan_member in retrieved_clan_members['items']
+                if clan_member['tag'] in self.pending_member_updates
+            )
+            self.pending_member_payloads.update(
+                (player_tag, self.unretrieved_clan_members[player_tag])
+                for player_tag in left_clan_member_tags
+                if player_tag in self.unretrieved_clan_members and player_tag in self.pending_member_updates
+            )
+            self.clan_members_count = len(retrieved_clan_members['items'])
+            if self.member_updates_debounce_seconds > 0:
+                if self.member_updates_flush is not None:
+                    self.member_updates_flush.cancel()
+                self.member_updates_flush = asyncio.create_task(self.send_member_updates_later())
+            else:
+                await self.send_member_updates()
+        for player_tag in left_clan_member_tags:
+            self.unretrieved_clan_members.pop(player_tag, None)
         return were_clan_members_dumped
 
+    async def send_member_updates_later(self) -> None:
+        await asyncio.sleep(self.member_updates_debounce_seconds)
+        self.member_updates_flush = None
+        await self.send_member_updates()
+
+    async def send_member_updates(self) -> None:
+        member_updates = self.pending_member_updates
+        member_payloads = self.pending_member_payloads
+        self.pending_member_updates = {}
+        self.pending_member_payloads = {}
+        if len(member_updates) == 0:
+            return
+        rows = await self.acquired_connection.fetch('''
+            SELECT chat_id
+            FROM clan_chat
+            WHERE clan_tag = $1 AND send_member_updates
+        ''', self.clan_tag)
+        chat_ids = [row['chat_id'] for row in rows]
+        if len(chat_ids) == 0:
+            return
+        rows = await self.acquired_connection.fetch('''
+            SELECT
+                player.player_tag, town_hall_level, barbarian_king_level, archer_queen_level,
+                minion_prince_level, grand_warden_level, royal_champion_level, dragon_duke_level,
+                bot_user.chat_id, bot_user.user_id
+            FROM
+                player
+                LEFT JOIN player_bot_user
+                    ON (player_bot_user.clan_tag, player_bot_user.player_tag) = (player.clan_tag, player.player_tag)
+                    AND player_bot_user.chat_id = any($3::bigint[])
+                LEFT JOIN bot_user
+                    ON (bot_user.clan_tag, bot_user.chat_id, bot_user.user_id)
+                        = (player_bot_user.clan_tag, player_bot_user.chat_id, player_bot_user.user_id)
+                    AND is_user_in_chat
+            WHERE player.clan_tag = $1 AND player.player_tag = any($2::varchar[])
+        ''', self.clan_tag, list(member_updates), chat_ids)
+        player_infos = {}
+        linked_user_ids = {}
+        for row in rows:
+            player_infos[row['player_tag']] = self.of.get_player_info_with_custom_emoji(
+                row['town_hall_level'],
+                row['barbarian_king_level'],
+                row['archer_queen_level'],
+                row['minion_prince_level'],
+                row['grand_warden_level'],
+                row['royal_champion_level'],
+                row['dragon_duke_level']
+            )
+            if row['user_id'] is not None:
+                linked_user_ids.setdefault((row['chat_id'], row['player_tag']), []).append(row['user_id'])
+        for player_tag, clan_member in member_payloads.items():
+            if player_tag not in player_infos:
+                player_infos[player_tag] = self.of.get_player_info_with_custom_emoji(clan_member['townHallLevel'])
+        for chat_id in chat_ids:
+            lines = []
+            for player_tag, update in member_updates.items():
+                if player_tag not in player_infos:
+                    continue
+                user_ids = linked_user_ids.get((chat_id, player_tag), [])
+                mentions = ''
+                if len(user_ids) > 0:
+                    mentions += f' ({', '.join(
+                        '👤 ' + self.of.to_html(self.load_full_name(chat_id, user_id)) for user_id in user_ids
+                    )})'
+                if player_tag in self.name or player_tag not in member_payloads:
+                    name = self.load_name(player_tag)
+                else:
+                    name = member_payloads[player_tag]['name']
+                lines.append(
+                    f'<b>{self.of.to_html(name)}</b> '
+                    f'{player_infos[player_tag]}{mentions} '
+                    f'{'покинул клан' if update == 'left' else 'вступил в клан'}'
+                )
+            if len(lines) == 0:
+                continue
+            if len(lines) == 1:
+                message_text = f'{lines[0]} ({self.clan_members_count} / 50 🪖)'
+            else:
+                message_text = '\n'.join(lines) + f'\n\n{self.clan_members_count} / 50 🪖'
+            await self.send_message_to_chat(
+                user_id=None,
+                chat_id=chat_id,
+                message_text=message_text,
+                user_ids_to_ping=None
+            )
+
     async def dump_clan(self) -> bool:
-        retrieved_clan = await self.api_client.get_clan(clan_tag=self.clan_tag)
+        retrieved_clan = await self.api_client.get_clan(clan_tag=self.clan_tag, priority=Priority.bulk)
         if retrieved_clan is None:
             return False
         await self.acquired_connection.execute('''
@@ -322,16 +571,53 @@ class DatabaseManager:
         ''', retrieved_clan['name'], self.clan_tag)
         return True
 
-    async def dump_clan_members(self) -> bool:
-        retrieved_clan_members = await self.api_client.get_clan_members(clan_tag=self.clan_tag)
+    async def refresh_clan_members(self) -> bool:
+        retrieved_clan_members = await self.api_client.get_clan_members(
+            clan_tag=self.clan_tag, priority=Priority.bulk
+        )
         if retrieved_clan_members is None:
             return False
-        player_tasks = [
-            self.api_client.get_player(player_tag=clan_member['tag'])
-            for clan_member in retrieved_clan_members['items']
-        ]
-        retrieved_players = list(await asyncio.gather(*player_tasks))
-        if None in retrieved_players:
+        clan_member_tags = [clan_member['tag'] for clan_member in retrieved_clan_members['items']]
+        war_member_tags = set()
+        clan_war = await self.load_clan_war()
+        if self.of.state(clan_war) in ('preparation', 'inWar'):
+            war_member_tags.update(member['tag'] for member in clan_war['clan']['members'])
+        for clan_war_league_war in await self.load_clan_war_league_own_wars() or []:
+            if self.of.state(clan_war_league_war) in ('preparation', 'inWar'):
+                war_member_tags.update(member['tag'] for member in clan_war_league_war['clan']['members'])
+        player_tags = await self.player_refresh_scheduler.choose(clan_member_tags, war_member_tags)
+        return await self.dump_clan_members(player_tags)
+
+    async def dump_clan_members(self, player_tags: Optional[list[str]] = None) -> bool:
+        retrieved_clan_members = await self.api_client.get_clan_members(
+            clan_tag=self.clan_tag, priority=Priority.bulk
+        )
+        if retrieved_clan_members is None:
+            return False
+        clan_member_tags = [clan_member['tag'] for clan_member in retrieved_clan_members['items']]
+        await self.acquired_connection.execute('''
+            UPDATE player
+            SET is_player_in_clan = player_tag = any($2::varchar[])
+            WHERE clan_tag = $1
+        ''', self.clan_tag, clan_member_tags)
+        if player_tags is None:
+            player_tags = clan_member_tags
+        if len(player_tags) == 0:
+            return True
+        retrieved_players_by_tag = await self.api_client.get_players(player_tags=player_tags, priority=Priority.bulk)
+        retrieved_players = [player for player in retrieved_players_by_tag.values() if player is not None]
+        clan_members_by_tag = {clan_member['tag']: clan_member for clan_member in retrieved_clan_members['items']}
+        for player_tag, player in retrieved_players_by_tag.items():
+            if player is None and player_tag in clan_members_by_tag:
+                self.unretrieved_clan_members[player_tag] = clan_members_by_tag[player_tag]
+            else:
+                self.unretrieved_clan_members.pop(player_tag, None)
+        if len(retrieved_players) < len(player_tags):
+            print(
+                f'{len(player_tags) - len(retrieved_players)} of {len(player_tags)} players were not '
+                f'retrieved, their last known data is kept'
+            )
+        if len(retrieved_players) == 0:
             return False
         rows = []
         for player in retrieved_players:
@@ -360,18 +646,13 @@ class DatabaseManager:
                 player['name'], True,
                 False, False,
                 barbarian_king_level, archer_queen_level, minion_price_level,
-                grand_warden_level, royal_champion_level, dragon_duke_level, json.dumps(player['heroEquipment']),
+                grand_warden_level, royal_champion_level, dragon_duke_level, player['heroEquipment'],
                 player['townHallLevel'], player.get('builderHallLevel', 0),
                 player['trophies'], player.get('builderBaseTrophies', 0),
                 player['leagueTier']['id'] - 105000000,
                 player['role'], player['clanCapitalContributions'],
                 player['donations'], player['donationsReceived']
             ))
-        await self.acquired_connection.execute('''
-            UPDATE player
-            SET is_player_in_clan = FALSE
-            WHERE clan_tag = $1
-        ''', self.clan_tag)
         await self.acquired_connection.executemany('''
             INSERT INTO player
                 (clan_tag, player_tag,
@@ -384,11 +665,11 @@ class DatabaseManager:
                 home_village_league_tier,
                 player_role, capital_gold_contributed,
                 donations_given, donations_received,
-                first_seen, last_seen)
+                first_seen, last_seen, refreshed_at)
             VALUES
                 ($1, $2,
                 $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21, $22,
-                NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
+                NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
             ON CONFLICT (clan_tag, player_tag)
             DO UPDATE SET
                 (player_name, is_player_in_clan,
@@ -399,12 +680,107 @@ class DatabaseManager:
                 home_village_league_tier,
                 player_role, capital_gold_contributed,
                 donations_given, donations_received,
-                last_seen) =
+                last_seen, refreshed_at) =
                 ($3, $4, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21, $22,
-                NOW() AT TIME ZONE 'UTC')
+                NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
         ''', rows)
+        await self.dump_player_hero_equipments(retrieved_players)
+        await self.player_history.record({
+            row[1]: (*row[13:17], *row[6:12], *row[19:22])
+            for row in rows
+        })
         return True
 
+    async def dump_hero_equipment_ore_costs(self) -> None:
+        await self.acquired_connection.executemany('''
+            INSERT INTO hero_equipment_ore_cost (max_level, level, shiny_ore, glowy_ore, starry_ore)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (max_level, level)
+            DO UPDATE SET (shiny_ore, glowy_ore, starry_ore) = ($3, $4, $5)
+        ''', self.of.hero_equipment_progress.get_ore_costs())
+        self.were_hero_equipment_ore_costs_dumped = True
+
+    async def backfill_player_hero_equipments(self) -> None:
+        await self.acquired_connection.execute('''
+            INSERT INTO player_hero_equipment (clan_tag, player_tag, name, level, max_level)
+            SELECT
+                clan_tag, player_tag,
+                equipment->>'name', (equipment->>'level')::int, (equipment->>'maxLevel')::int
+            FROM
+                player
+                CROSS JOIN jsonb_array_elements(COALESCE(hero_equipment, '[]'::jsonb)) AS equipments(equipment)
+            WHERE clan_tag = $1 AND NOT EXISTS (
+                SELECT 1
+                FROM player_hero_equipment
+                WHERE (player_hero_equipment.clan_tag, player_hero_equipment.player_tag)
+                    = (player.clan_tag, player.player_tag)
+            )
+            ON CONFLICT (clan_tag, player_tag, name) DO NOTHING
+        ''', self.clan_tag)
+
+    async def dump_player_hero_equipments(self, retrieved_players: list[dict]) -> None:
+        if self.hero_equipment_levels is None:
+            rows = await self.acquired_connection.fetch('''
+                SELECT player_tag, name, level, max_level
+                FROM player_hero_equipment
+                WHERE clan_tag = $1
+            ''', self.clan_tag)
+            self.hero_equipment_levels = {
+                (row['player_tag'], row['name']): (row['level'], row['max_level']) for row in rows
+            }
+        rows = [
+            (self.clan_tag, player['tag'], hero_equipment['name'], hero_equipment['level'], hero_equipment['maxLevel'])
+            for player in retrieved_players
+            for hero_equipment in player['heroEquipment']
+            if self.hero_equipment_levels.get((player['tag'], hero_equipment['name']))
+               != (hero_equipment['level'], hero_equipment['maxLevel'])
+        ]
+        if len(rows) == 0:
+            return
+        await self.acquired_connection.executemany('''
+            INSERT INTO player_hero_equipment (clan_tag, player_tag, name, level, max_level)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (clan_tag, player_tag, name)
+            DO UPDATE SET (level, max_level) = ($4, $5)
+        ''', rows)
+        for _, player_tag, name, level, max_level in rows:
+            self.hero_equipment_levels[(player_tag, name)] = (level, max_level)
+
+    async def load_hero_equipment_progress(self) -> dict[str, tuple[float, float, float, float]]:
+        if not self.were_hero_equipment_ore_costs_dumped:
+            await self.dump_hero_equipment_ore_costs()
+        rows = await self.acquired_connection.fetch('''
+            SELECT
+                player.player_tag,
+                coalesce(sum(shiny_ore), 0) AS shiny_ore,
+                coalesce(sum(glowy_ore), 0) AS glowy_ore,
+                coalesce(sum(starry_ore), 0) AS starry_ore,
+                coalesce(sum(player_hero_equipment.level), 0) AS levels
+            FROM
+                player
+                LEFT JOIN player_hero_equipment
+                    ON (player_hero_equipment.clan_tag, player_hero_equipment.player_tag)
+                        = (player.clan_tag, player.player_tag)
+                    AND name = any($2::varchar[])
+                LEFT JOIN hero_equipment_ore_cost USING (max_level, level)
+            WHERE player.clan_tag = $1 AND is_player_in_clan
+            GROUP BY player.player_tag
+        ''', self.clan_tag, list(self.of.get_available_hero_equipments()))
+        return {
+            row['player_tag']: self.of.hero_equipment_progress.to_percentages(
+                (row['shiny_ore'], row['glowy_ore'], row['starry_ore'], row['levels'])
+            )
+            for row in rows
+        }
+
+    async def load_player_hero_equipments(self, player_tag: str) -> list[dict]:
+        rows = await self.acquired_connection.fetch('''
+            SELECT name, level, max_level
+            FROM player_hero_equipment
+            WHERE (clan_tag, player_tag) = ($1, $2)
+        ''', self.clan_tag, player_tag)
+        return [{'name': row['name'], 'level': row['level'], 'maxLevel': row['max_level']} for row in rows]
+
     async def load_and_cache_names(self) -> None:
         rows = await self.acquired_connection.fetch('''
             SELECT clan_tag, clan_name
@@ -495,7 +871,7 @@ class DatabaseManager:
             VALUES ($1, $2, $3)
             ON CONFLICT (clan_tag, start_time)
             DO UPDATE SET data = $3
-        ''', self.clan_tag, self.of.to_datetime(retrieved_clan_games['startTime']), json.dumps(retrieved_clan_games))
+        ''', self.clan_tag, self.of.to_datetime(retrieved_clan_games['startTime']), retrieved_clan_games)
 
         new_clan_games = await self.load_clan_games()
 
@@ -512,7 +888,7 @@ class DatabaseManager:
         ''', self.clan_tag)
         if row is None:
             return None
-        return json.loads(row['data'])
+        return row['data']
 
     async def clan_games_alert(self, old_cg: dict, cg: dict) -> None:
         await self.acquired_connection.execute('''
@@ -566,17 +942,36 @@ class DatabaseManager:
                 )
 
     async def dump_clan_war(self) -> bool:
-        old_clan_war = await self.load_clan_war() or {'startTime': None, 'state': None}
-
-        retrieved_clan_war = await self.api_client.get_clan_current_war(clan_tag=self.clan_tag)
+        retrieved_clan_war = await self.api_client.get_clan_current_war(
+            clan_tag=self.clan_tag, priority=Priority.alert
+        )
         if retrieved_clan_war is None or retrieved_clan_war.get('startTime') is None:
             return False
-        await self.acquired_connection.execute('''
-            INSERT INTO clan_war (clan_tag, start_time, data)
-            VALUES ($1, $2, $3)
+        if self.is_response_dumped('clan_war', retrieved_clan_war):
+            await self.clan_war_half_time_alert(retrieved_clan_war)
+            return True
+        fingerprint_key = ('clan_war', retrieved_clan_war['startTime'])
+        fingerprint = self.get_fingerprint(retrieved_clan_war)
+        if self.fingerprints.get(fingerprint_key) == fingerprint:
+            self.dumped_responses['clan_war'] = retrieved_clan_war
+            await self.clan_war_half_time_alert(retrieved_clan_war)
+            return True
+
+        old_clan_war = await self.load_clan_war() or {'startTime': None, 'state': None}
+        is_clan_war_updated = await self.acquired_connection.fetchval('''
+            INSERT INTO clan_war (clan_tag, start_time, data, data_fingerprint)
+            VALUES ($1, $2, $3, $4)
             ON CONFLICT (clan_tag, start_time)
-            DO UPDATE SET data = $3
-        ''', self.clan_tag, self.of.to_datetime(retrieved_clan_war['startTime']), json.dumps(retrieved_clan_war))
+            DO UPDATE SET (data, data_fingerprint) = ($3, $4)
+            WHERE clan_war.data_fingerprint IS DISTINCT FROM $4
+            RETURNING TRUE
+        ''', self.clan_tag, self.of.to_datetime(retrieved_clan_war['startTime']), retrieved_clan_war, fingerprint)
+        self.fingerprints[fingerprint_key] = fingerprint
+        self.dumped_responses['clan_war'] = retrieved_clan_war
+        if not is_clan_war_updated:
+            await self.clan_war_half_time_alert(retrieved_clan_war)
+            return True
+        await self.invalidate_snapshots('clan_war')
 
         new_clan_war = await self.load_clan_war()
         await asyncio.gather(
@@ -591,6 +986,9 @@ class DatabaseManager:
         return True
 
     async def load_clan_war(self) -> Optional[dict]:
+        return await self.snapshots.load('clan_war', self.fetch_clan_war)
+
+    async def fetch_clan_war(self) -> Optional[dict]:
         row = await self.acquired_connection.fetchrow('''
             SELECT data
             FROM clan_war
@@ -599,18 +997,52 @@ class DatabaseManager:
         ''', self.clan_tag)
         if row is None:
             return None
-        return json.loads(row['data'])
+        return row['data']
+
+    async def load_clan_war_members(self) -> tuple[Optional[dict], list[WarMember]]:
+        row = await self.acquired_connection.fetchrow('''
+            SELECT
+                data - 'clan' - 'opponent' || jsonb_build_object(
+                    'clan', (data->'clan') - 'members',
+                    'opponent', (data->'opponent') - 'members'
+                ) AS data,
+                (
+                    SELECT jsonb_agg(jsonb_build_object(
+                        'tag', member->'tag',
+                        'attacks', jsonb_array_length(COALESCE(member->'attacks', '[]'::jsonb))
+                    ))
+                    FROM jsonb_array_elements(COALESCE(data->'clan'->'members', '[]'::jsonb)) AS members(member)
+                ) AS members
+            FROM clan_war
+            WHERE clan_tag = $1
+            ORDER BY start_time DESC
+            LIMIT 1
+        ''', self.clan_tag)
+        if row is None:
+            return None, []
+        cw_members = [
+            WarMember(
+                player_tag=cw_member['tag'],
+                attacks_spent=cw_member['attacks'],
+                attacks_limit=row['data']['attacksPerMember']
+            )
+            for cw_member in row['members'] or []
+        ]
+        return row['data'], cw_members
 
     async def dump_clan_war_log(self, clan_tag: str) -> bool:
-        retrieved_clan_war_log = await self.api_client.get_war_log(clan_tag=clan_tag)
+        retrieved_clan_war_log = await self.api_client.get_war_log(clan_tag=clan_tag, priority=Priority.bulk)
         if retrieved_clan_war_log is None:
             return False
+        if self.is_response_dumped(('clan_war_log', clan_tag), retrieved_clan_war_log):
+            return True
         await self.acquired_connection.execute('''
             INSERT INTO clan_war_log (clan_tag, data)
             VALUES ($1, $2)
             ON CONFLICT (clan_tag)
             DO UPDATE SET data = $2
-        ''', clan_tag, json.dumps(retrieved_clan_war_log))
+        ''', clan_tag, retrieved_clan_war_log)
+        self.dumped_responses[('clan_war_log', clan_tag)] = retrieved_clan_war_log
         return True
 
     async def load_clan_war_log(self, clan_tag: str) -> Optional[dict]:
@@ -621,10 +1053,10 @@ class DatabaseManager:
         ''', clan_tag)
         if row is None:
             return None
-        return json.loads(row['data'])
+        return row['data']
 
     async def dump_war_win_streak(self, clan_tag: str) -> bool:
-        retrieved_clan = await self.api_client.get_clan(clan_tag=clan_tag)
+        retrieved_clan = await self.api_client.get_clan(clan_tag=clan_tag, priority=Priority.bulk)
         if retrieved_clan is None:
             return False
         await self.acquired_connection.execute('''
@@ -643,13 +1075,25 @@ class DatabaseManager:
         return val
 
     async def dump_opponent_players(self, war: dict) -> bool:
-        opponent_player_tasks = [
-            self.api_client.get_player(player_tag=member['tag'])
-            for member in war['opponent']['members']
+        rows = await self.acquired_connection.fetch('''
+            SELECT player_tag
+            FROM opponent_player
+            WHERE clan_tag = $1 AND refreshed_at > NOW() AT TIME ZONE 'UTC' - $2::integer * INTERVAL '1 second'
+        ''', war['opponent']['tag'], self.player_refresh_scheduler.member_refresh_seconds)
+        fresh_opponent_player_tags = {row['player_tag'] for row in rows}
+        opponent_player_tags = [
+            member['tag'] for member in war['opponent']['members'] if member['tag'] not in fresh_opponent_player_tags
+        ]
+        if len(opponent_player_tags) == 0:
+            return True
+        retrieved_opponent_players_by_tag = await self.api_client.get_players(
+            player_tags=opponent_player_tags, priority=Priority.bulk
+        )
+        retrieved_opponent_players = [
+            opponent_player
+            for opponent_player in retrieved_opponent_players_by_tag.values()
+            if opponent_player is not None
         ]
-        retrieved_opponent_players = list(await asyncio.gather(*opponent_player_tasks))
-        if None in retrieved_opponent_players:
-            return False
         rows = []
         for opponent_player in retrieved_opponent_players:
             player_heroes = opponent_player.get('heroes', [])
@@ -683,18 +1127,22 @@ class DatabaseManager:
                 (clan_tag, player_tag,
                 player_name, town_hall_level,
                 barbarian_king_level, archer_queen_level, minion_prince_level,
-                grand_warden_level, royal_champion_level, dragon_duke_level)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                grand_warden_level, royal_champion_level, dragon_duke_level, refreshed_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, NOW() AT TIME ZONE 'UTC')
             ON CONFLICT (clan_tag, player_tag)
             DO UPDATE SET
                 (player_name, town_hall_level,
                 barbarian_king_level, archer_queen_level, minion_prince_level,
-                grand_warden_level, royal_champion_level, dragon_duke_level) =
-                ($3, $4, $5, $6, $7, $8, $9, $10)
+                grand_warden_level, royal_champion_level, dragon_duke_level, refreshed_at) =
+                ($3, $4, $5, $6, $7, $8, $9, $10, NOW() AT TIME ZONE 'UTC')
         ''', rows)
-        return True
+        return len(retrieved_opponent_players) == len(opponent_player_tags)
+
+    async def clan_war_half_time_alert(self, cw: dict) -> None:
+        if self.of.state(cw) == 'inWar':
+            await self.clan_war_alert(cw, cw, None, None)
 
-    async def clan_war_alert(self, old_cw: dict, cw: dict, war_win_streak: int, cw_log: Optional[dict]) -> None:
+    async def clan_war_alert(self, old_cw: dict, cw: dict, war_win_streak: Optional[int], cw_log: Optional[dict]) -> None:
         SECONDS_IN_HOUR = 3600
         await self.acquired_connection.execute('''
             INSERT INTO activity
@@ -771,29 +1219,51 @@ class DatabaseManager:
                 )
 
     async def dump_raid_weekends(self) -> bool:
-        old_raids = await self.load_raid_weekend() or {'startTime': None, 'state': None}
-
-        retrieved_raid_weekends = await self.api_client.get_clan_capital_raid_seasons(clan_tag=self.clan_tag)
+        retrieved_raid_weekends = await self.api_client.get_clan_capital_raid_seasons(
+            clan_tag=self.clan_tag, priority=Priority.alert
+        )
         if not retrieved_raid_weekends or not retrieved_raid_weekends['items']:
             return False
-        await self.acquired_connection.executemany('''
-            INSERT INTO raid_weekend (clan_tag, start_time, data)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (clan_tag, start_time)
-            DO UPDATE SET data = $3
-        ''', [
-            (self.clan_tag, self.of.to_datetime(item['startTime']), json.dumps(item))
+        if self.is_response_dumped('raid_weekends', retrieved_raid_weekends):
+            return True
+        fingerprints = {
+            ('raid_weekend', item['startTime']): self.get_fingerprint(item)
             for item in retrieved_raid_weekends['items']
             if item.get('members') is not None
-        ])
+        }
+        rows = [
+            (self.clan_tag, self.of.to_datetime(item['startTime']), item, fingerprint)
+            for item in retrieved_raid_weekends['items']
+            if (fingerprint := fingerprints.get(('raid_weekend', item['startTime']))) is not None
+            and self.fingerprints.get(('raid_weekend', item['startTime'])) != fingerprint
+        ]
+        self.dumped_responses['raid_weekends'] = retrieved_raid_weekends
+        if len(rows) == 0:
+            return True
+
+        old_raids = await self.load_raid_weekend() or {'startTime': None, 'state': None}
+        await self.acquired_connection.executemany('''
+            INSERT INTO raid_weekend (clan_tag, start_time, data, data_fingerprint)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (clan_tag, start_time)
+            DO UPDATE SET (data, data_fingerprint) = ($3, $4)
+            WHERE raid_weekend.data_fingerprint IS DISTINCT FROM $4
+        ''', rows)
+        self.fingerprints.update(fingerprints)
+        await self.invalidate_snapshots('raid_weekend')
 
         new_raids = await self.load_raid_weekend()
+        if new_raids == old_raids:
+            return True
 
         await self.raid_weekend_alert(old_raids, new_raids)
 
         return True
 
     async def load_raid_weekend(self) -> Optional[dict]:
+        return await self.snapshots.load('raid_weekend', self.fetch_raid_weekend)
+
+    async def fetch_raid_weekend(self) -> Optional[dict]:
         row = await self.acquired_connection.fetchrow('''
             SELECT data
             FROM raid_weekend
@@ -802,7 +1272,41 @@ class DatabaseManager:
         ''', self.clan_tag)
         if row is None:
             return None
-        return json.loads(row['data'])
+        return row['data']
+
+    async def load_raid_weekend_members(self) -> tuple[Optional[dict], list[RaidsMember]]:
+        row = await self.acquired_connection.fetchrow('''
+            SELECT
+                data - 'members' - 'attackLog' - 'defenseLog' || jsonb_build_object(
+                    'attackLog', COALESCE((
+                        SELECT jsonb_agg(jsonb_build_object(
+                            'districts', (
+                                SELECT COALESCE(jsonb_agg(district - 'attacks' ORDER BY district_number), '[]'::jsonb)
+                                FROM jsonb_array_elements(COALESCE(raid->'districts', '[]'::jsonb))
+                                    WITH ORDINALITY AS districts(district, district_number)
+                            )
+                        ) ORDER BY raid_number)
+                        FROM jsonb_array_elements(COALESCE(data->'attackLog', '[]'::jsonb))
+                            WITH ORDINALITY AS raids(raid, raid_number)
+                    ), '[]'::jsonb)
+                ) AS data,
+                data->'members' AS members
+            FROM raid_weekend
+            WHERE clan_tag = $1
+            ORDER BY start_time DESC
+            LIMIT 1
+        ''', self.clan_tag)
+        if row is None:
+            return None, []
+        raids_members = [
+            RaidsMember(
+                player_tag=raids_member['tag'],
+                attacks_spent=raids_member['attacks'],
+                attacks_limit=raids_member['attackLimit'] + raids_member['bonusAttackLimit']
+            )
+            for raids_member in row['members'] or []
+        ]
+        return row['data'], raids_members
 
     async def raid_weekend_alert(self, old_raids: dict, raids: dict) -> None:
         await self.acquired_connection.execute('''
@@ -859,18 +1363,34 @@ class DatabaseManager:
                 )
 
     async def dump_clan_war_league(self) -> bool:
-        retrieved_clan_war_league = await self.api_client.get_clan_war_league_group(clan_tag=self.clan_tag)
+        retrieved_clan_war_league = await self.api_client.get_clan_war_league_group(
+            clan_tag=self.clan_tag, priority=Priority.alert
+        )
         if retrieved_clan_war_league is None:
             return False
-        await self.acquired_connection.execute('''
-            INSERT INTO clan_war_league (clan_tag, season, data)
-            VALUES ($1, $2, $3)
-            ON CONFLICT (clan_tag, season)
-            DO UPDATE SET data = $3
-        ''', self.clan_tag, retrieved_clan_war_league['season'], json.dumps(retrieved_clan_war_league))
+        if self.is_response_dumped('clan_war_league', retrieved_clan_war_league):
+            return True
+        fingerprint_key = ('clan_war_league', retrieved_clan_war_league['season'])
+        fingerprint = self.get_fingerprint(retrieved_clan_war_league)
+        if self.fingerprints.get(fingerprint_key) != fingerprint:
+            await self.acquired_connection.execute('''
+                INSERT INTO clan_war_league (clan_tag, season, data, data_fingerprint)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (clan_tag, season)
+                DO UPDATE SET (data, data_fingerprint) = ($3, $4)
+                WHERE clan_war_league.data_fingerprint IS DISTINCT FROM $4
+            ''', self.clan_tag, retrieved_clan_war_league['season'], retrieved_clan_war_league, fingerprint)
+            self.fingerprints[fingerprint_key] = fingerprint
+            await self.invalidate_snapshots(
+                'clan_war_league', 'clan_war_league_own_wars', 'clan_war_league_last_day_wars'
+            )
+        self.dumped_responses['clan_war_league'] = retrieved_clan_war_league
         return True
 
     async def load_clan_war_league(self) -> tuple[Optional[str], Optional[dict]]:
+        return await self.snapshots.load('clan_war_league', self.fetch_clan_war_league)
+
+    async def fetch_clan_war_league(self) -> tuple[Optional[str], Optional[dict]]:
         row = await self.acquired_connection.fetchrow('''
             SELECT season, data
             FROM clan_war_league
@@ -879,7 +1399,7 @@ class DatabaseManager:
         ''', self.clan_tag)
         if row is None:
             return None, None
-        return row['season'], json.loads(row['data'])
+        return row['season'], row['data']
 
     async def dump_clan_war_league_wars(self) -> bool:
         old_cwl_season, _ = await self.load_clan_war_league()
@@ -904,25 +1424,42 @@ class DatabaseManager:
             if row is None:
                 clan_war_league_wars_to_retrieve.append(clan_war_league_war)
         clan_war_league_war_tasks = [
-            self.api_client.get_clan_war_league_war(war_tag=clan_war_league_war_to_retrieve.war_tag)
+            self.api_client.get_clan_war_league_war(
+                war_tag=clan_war_league_war_to_retrieve.war_tag, priority=Priority.alert
+            )
             for clan_war_league_war_to_retrieve in clan_war_league_wars_to_retrieve
         ]
         retrieved_clan_war_league_wars = list(await asyncio.gather(*clan_war_league_war_tasks))
         if None in retrieved_clan_war_league_wars:
             return False
-        rows = zip(
-            [clan_war_league_war.clan_tag for clan_war_league_war in clan_war_league_wars_to_retrieve],
-            [clan_war_league_war.war_tag for clan_war_league_war in clan_war_league_wars_to_retrieve],
-            [clan_war_league_war.season for clan_war_league_war in clan_war_league_wars_to_retrieve],
-            [clan_war_league_war.day for clan_war_league_war in clan_war_league_wars_to_retrieve],
-            map(json.dumps, retrieved_clan_war_league_wars)
-        )
+        rows = [
+            (
+                clan_war_league_war.clan_tag,
+                clan_war_league_war.war_tag,
+                clan_war_league_war.season,
+                clan_war_league_war.day,
+                retrieved_clan_war_league_war
+            )
+            for clan_war_league_war, retrieved_clan_war_league_war
+            in zip(clan_war_league_wars_to_retrieve, retrieved_clan_war_league_wars)
+            if not self.is_response_dumped(
+                ('clan_war_league_war', clan_war_league_war.war_tag), retrieved_clan_war_league_war
+            )
+        ]
         await self.acquired_connection.executemany('''
             INSERT INTO clan_war_league_war (clan_tag, war_tag, season, day, data)
             VALUES ($1, $2, $3, $4, $5)
             ON CONFLICT (clan_tag, war_tag)
             DO UPDATE SET (season, day, data) = ($3, $4, $5)
         ''', rows)
+        if len(rows) > 0:
+            await self.invalidate_snapshots('clan_war_league_own_wars', 'clan_war_league_last_day_wars')
+        if len(rows) > 0 or not self.were_clan_war_league_war_ratings_dumped:
+            await self.dump_clan_war_league_war_ratings(loaded_clan_war_league_season)
+        for clan_war_league_war, retrieved_clan_war_league_war in zip(
+                clan_war_league_wars_to_retrieve, retrieved_clan_war_league_wars
+        ):
+            self.dumped_responses[('clan_war_league_war', clan_war_league_war.war_tag)] = retrieved_clan_war_league_war
 
         new_cwl_season, _ = await self.load_clan_war_league()
         new_cwlws = await self.load_clan_war_league_own_wars()
@@ -942,7 +1479,7 @@ class DatabaseManager:
         if old_cwl_season != new_cwl_season:
             old_cwlws = []
         if len(old_cwlws) < len(new_cwlws):
-            old_cwlws += [{'startTime': None, 'state': None}] * (len(new_cwlws) - len(old_cwlws))
+            old_cwlws = old_cwlws + [{'startTime': None, 'state': None}] * (len(new_cwlws) - len(old_cwlws))
         for cwl_day, (old_cwlw, new_cwlw) in enumerate(zip(old_cwlws, new_cwlws)):
             war_win_streak = await self.load_war_win_streak(clan_tag=new_cwlw['opponent']['tag'])
             cw_log = await self.load_clan_war_log(clan_tag=new_cwlw['opponent']['tag'])
@@ -966,18 +1503,21 @@ class DatabaseManager:
             return day, clan_war_league_war
 
     async def load_clan_war_league_own_wars(self) -> Optional[list[dict]]:
+        return await self.snapshots.load('clan_war_league_own_wars', self.fetch_clan_war_league_own_wars)
+
+    async def fetch_clan_war_league_own_wars(self) -> Optional[list[dict]]:
         season, _ = await self.load_clan_war_league()
         if season is None:
             return None
         rows = await self.acquired_connection.fetch('''
             SELECT data
             FROM clan_war_league_war
-            WHERE (clan_tag, season) = ($1, $2) AND $1 IN (data->'clan'->>'tag', data->'opponent'->>'tag')
+            WHERE (clan_tag, season) = ($1, $2) AND (data->'clan'->>'tag' = $1 OR data->'opponent'->>'tag' = $1)
             ORDER BY day
         ''', self.clan_tag, season)
         clan_war_league_wars = []
         for row in rows:
-            clan_war_league_war = json.loads(row['data'])
+            clan_war_league_war = row['data']
             if clan_war_league_war['opponent']['tag'] == self.clan_tag:
                 clan_war_league_war['clan'], clan_war_league_war['opponent'] = (
                     clan_war_league_war['opponent'], clan_war_league_war['clan']
@@ -986,6 +1526,9 @@ class DatabaseManager:
         return clan_war_league_wars
 
     async def load_clan_war_league_last_day_wars(self) -> Optional[list[dict]]:
+        return await self.snapshots.load('clan_war_league_last_day_wars', self.fetch_clan_war_league_last_day_wars)
+
+    async def fetch_clan_war_league_last_day_wars(self) -> Optional[list[dict]]:
         season, _ = await self.load_clan_war_league()
         if season is None:
             return None
@@ -996,7 +1539,7 @@ class DatabaseManager:
                 (clan_tag, season) = ($1, $2)
                 AND day IN (SELECT MAX(day) FROM clan_war_league_war WHERE (clan_tag, season) = ($1, $2))
         ''', self.clan_tag, season)
-        return [json.loads(row['data']) for row in rows]
+        return [row['data'] for row in rows]
 
     async def clan_war_league_war_alert(
             self, old_cwlw: dict, cwlw: dict, cwl_season: str, cwl_day: int, war_win_streak: int, cw_log: Optional[dict]
@@ -1093,50 +1636,122 @@ class DatabaseManager:
         )
         return True
 
+    async def load_snapshot_versions(self, names: list[str]) -> tuple[Optional[int], ...]:
+        loaders = {
+            'clan_war': self.load_clan_war,
+            'raid_weekend': self.load_raid_weekend,
+            'clan_war_league': self.load_clan_war_league,
+            'clan_war_league_own_wars': self.load_clan_war_league_own_wars,
+            'clan_war_league_last_day_wars': self.load_clan_war_league_last_day_wars
+        }
+        for name in names:
+            await loaders[name]()
+        return tuple(self.snapshots.version(name) for name in names)
+
+    async def render(
+            self,
+            key: Any,
+            snapshot_names: list[str],
+            renderer: Callable[[], Awaitable[tuple[str, ParseMode, Optional[InlineKeyboardMarkup]]]]
+    ) -> tuple[str, ParseMode, Optional[InlineKeyboardMarkup]]:
+        versions = await self.load_snapshot_versions(snapshot_names)
+        rendered = self.render_cache.get((key, versions))
+        if rendered is None:
+            rendered = await renderer()
+            if None not in versions:
+                self.render_cache.set((key, versions), rendered)
+        return rendered
+
+    def get_war_view(self, war: dict) -> WarView:
+        for viewed_war, war_view in self.war_views:
+            if viewed_war is war:
+                return war_view
+        war_view = self.of.get_war_view(war)
+        self.war_views.append((war, war_view))
+        return war_view
+
     async def get_clan_war_league_rating(self, cwlw: dict) -> dict[str, CWLWPlayerRating]:
         cwlw_rating = {}
-        opponent_map_position_by_tag = self.of.calculate_map_positions(cwlw['opponent']['members'])
         if self.of.state(cwlw) == 'preparation':
             return {}
-        for player in cwlw['clan']['members']:
-            if len(player.get('attacks', [])) > 0:
-                attack = player['attacks'][0]
-                previous_stars = [
-                    clanmate['attacks'][0]['stars']
-                    if (clanmate.get('attacks') is not None and
-                        clanmate['attacks'][0]['order'] < attack['order'] and
-                        clanmate['attacks'][0]['defenderTag'] == attack['defenderTag'])
-                    else 0
-                    for clanmate
-                    in cwlw['clan']['members']
-                ]
-                attack_new_stars = attack['stars'] - (max(previous_stars) if len(previous_stars) > 0 else 0)
-                attack_destruction_percentage = attack['destructionPercentage']
-                if attack_new_stars < 0:
-                    attack_new_stars = 0
+        war_view = self.of.get_war_view(cwlw)
+        for player in war_view.clan.members:
+            if len(player.attacks) > 0:
+                attack = player.attacks[0]
+                attack_new_stars = attack.new_stars
+                attack_destruction_percentage = attack.destruction_percentage
+                if attack.stars < attack.previous_stars:
                     attack_destruction_percentage = 0
-                attack_map_position = opponent_map_position_by_tag[attack['defenderTag']]
+                attack_map_position = war_view.opponent.member_by_tag[attack.defender_tag].map_position
             else:
                 if self.of.state(cwlw) == 'inWar':
                     attack_new_stars, attack_destruction_percentage, attack_map_position = None, None, None
                 else:
                     attack_new_stars, attack_destruction_percentage, attack_map_position = 0, 0, None
             if self.of.state(cwlw) == 'warEnded':
-                if player.get('bestOpponentAttack'):
-                    defense_stars = player['bestOpponentAttack']['stars']
-                    defense_destruction_percentage = player['bestOpponentAttack']['destructionPercentage']
+                if player.best_opponent_attack is not None:
+                    defense_stars = player.best_opponent_attack.stars
+                    defense_destruction_percentage = player.best_opponent_attack.destruction_percentage
                 else:
                     defense_stars = 0
                     defense_destruction_percentage = 0
             else:
                 defense_stars = None
                 defense_destruction_percentage = None
-            cwlw_rating[player['tag']] = CWLWPlayerRating(
+            cwlw_rating[player.player_tag] = CWLWPlayerRating(
                 attack_new_stars, attack_destruction_percentage, attack_map_position,
                 defense_stars, defense_destruction_percentage
             )
         return cwlw_rating
 
+    async def dump_clan_war_league_war_ratings(self, cwl_season: str) -> None:
+        rows = await self.acquired_connection.fetch('''
+            SELECT war_tag, day, data
+            FROM clan_war_league_war
+            WHERE
+                (clan_tag, season) = ($1, $2)
+                AND (data->'clan'->>'tag' = $1 OR data->'opponent'->>'tag' = $1)
+                AND data->>'state' <> 'preparation'
+                AND NOT EXISTS (
+                    SELECT war_tag
+                    FROM clan_war_league_war_rating
+                    WHERE
+                        (clan_war_league_war_rating.clan_tag, clan_war_league_war_rating.war_tag)
+                            = (clan_war_league_war.clan_tag, clan_war_league_war.war_tag)
+                        AND war_state = 'warEnded'
+                )
+        ''', self.clan_tag, cwl_season)
+        rating_rows = []
+        for row in rows:
+            cwlw = row['data']
+            if cwlw['opponent']['tag'] == self.clan_tag:
+                cwlw['clan'], cwlw['opponent'] = cwlw['opponent'], cwlw['clan']
+            cwlw_rating = await self.get_clan_war_league_rating(cwlw)
+            rating_rows.extend(
+                (
+                    self.clan_tag, row['war_tag'], cwl_season, row['day'], player_tag, self.of.state(cwlw),
+                    rating.attack_new_stars, rating.attack_destruction_percentage, rating.attack_map_position,
+                    rating.defense_stars, rating.defense_destruction_percentage
+                )
+                for player_tag, rating in cwlw_rating.items()
+            )
+        await self.acquired_connection.executemany('''
+            INSERT INTO clan_war_league_war_rating (
+                clan_tag, war_tag, season, day, player_tag, war_state,
+                attack_new_stars, attack_destruction_percentage, attack_map_position,
+                defense_stars, defense_destruction_percentage
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+            ON CONFLICT (clan_tag, war_tag, player_tag)
+            DO UPDATE SET (
+                war_state,
+                attack_new_stars, attack_destruction_percentage, attack_map_position,
+                defense_stars, defense_destruction_percentage
+            ) = ($6, $7, $8, $9, $10, $11)
+            WHERE clan_war_league_war_rating.war_state <> 'warEnded'
+        ''', rating_rows)
+        self.were_clan_war_league_war_ratings_dumped = True
+
     async def get_cwl_ratings(self, cwl_season: str, cwlws: list[dict]) -> dict[str, CWLPlayerRating]:
         player_tags = {}
         for cwlw in cwlws:
@@ -1152,19 +1767,28 @@ class DatabaseManager:
         ''', self.clan_tag, cwl_season)
         for row in rows:
             player_tags[row['player_tag']].bonus_points.append(row['points'])
-        for cwlw in cwlws:
-            cwlw_rating = await self.get_clan_war_league_rating(cwlw)
-            for player_tag, rating in cwlw_rating.items():
-                if rating.attack_new_stars is not None:
-                    player_tags[player_tag].attack_new_stars.append(rating.attack_new_stars)
-                if rating.attack_destruction_percentage is not None:
-                    player_tags[player_tag].attack_destruction_percentage.append(rating.attack_destruction_percentage)
-                if rating.attack_map_position is not None:
-                    player_tags[player_tag].attack_map_position.append(rating.attack_map_position)
-                if rating.defense_stars is not None:
-                    player_tags[player_tag].defense_stars.append(rating.defense_stars)
-                if rating.defense_destruction_percentage is not None:
-                    player_tags[player_tag].defense_destruction_percentage.append(rating.defense_destruction_percentage)
+        rows = await self.acquired_connection.fetch('''
+            SELECT
+                player_tag, attack_new_stars, attack_destruction_percentage, attack_map_position,
+                defense_stars, defense_destruction_percentage
+            FROM clan_war_league_war_rating
+            WHERE (clan_tag, season) = ($1, $2)
+            ORDER BY day
+        ''', self.clan_tag, cwl_season)
+        for row in rows:
+            rating = player_tags.get(row['player_tag'])
+            if rating is None:
+                continue
+            if row['attack_new_stars'] is not None:
+                rating.attack_new_stars.append(row['attack_new_stars'])
+            if row['attack_destruction_percentage'] is not None:
+                rating.attack_destruction_percentage.append(row['attack_destruction_percentage'])
+            if row['attack_map_position'] is not None:
+                rating.attack_map_position.append(row['attack_map_position'])
+            if row['defense_stars'] is not None:
+                rating.defense_stars.append(row['defense_stars'])
+            if row['defense_destruction_percentage'] is not None:
+                rating.defense_destruction_percentage.append(row['defense_destruction_percentage'])
         for player_tag, r in player_tags.items():
             player_tags[player_tag].total_attack_new_stars_points = sum(
                 self.cwl_rating_config.attack_stars_points[attack_new_stars]
@@ -1203,34 +1827,14 @@ class DatabaseManager:
         return player_tags
 
     async def dump_user(self, chat: Chat, user: User) -> None:
-        if chat.type in [ChatType.GROUP, ChatType.SUPERGROUP]:
-            await self.acquired_connection.execute('''
-                INSERT INTO bot_user
-                    (clan_tag, chat_id, user_id,
-                    username, first_name, last_name, is_user_in_chat, first_seen, last_seen)
-                VALUES 
-                    ($1, $2, $3, $4, $5, $6, TRUE, NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
-                ON CONFLICT
-                    (clan_tag, chat_id, user_id)
-                DO UPDATE SET
-                    (username, first_name, last_name, is_user_in_chat, last_seen) = 
-                    ($4, $5, $6, TRUE, NOW() AT TIME ZONE 'UTC')
-            ''', self.clan_tag, chat.id, user.id, user.username, user.first_name, user.last_name)
-        elif chat.type == ChatType.PRIVATE:
-            await self.acquired_connection.execute('''
-                INSERT INTO bot_user
-                    (clan_tag, chat_id, user_id,
-                    username, first_name, last_name, is_user_in_chat, first_seen, last_seen)
-                VALUES 
-                    ($1, $2, $3, $4, $5, $6, TRUE, NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
-                ON CONFLICT
-                (clan_tag, chat_id, user_id)
-                DO UPDATE SET
-                    (username, first_name, last_name, is_user_in_chat, last_seen) = 
-                    ($4, $5, $6, TRUE, NOW() AT TIME ZONE 'UTC')
-            ''', self.clan_tag, chat.id, user.id, user.username, user.first_name, user.last_name)
+        if chat.type in [ChatType.GROUP, ChatType.SUPERGROUP, ChatType.PRIVATE]:
+            if (chat.id, user.id) not in self.write_behind_buffer.written_users:
+                self.permission_service.invalidate(user.id)
+            await self.write_behind_buffer.put_user(chat.id, user.id, user.username, user.first_name, user.last_name)
 
     async def undump_user(self, chat: Chat, user: User) -> None:
+        self.write_behind_buffer.discard_user(chat.id, user.id)
+        self.permission_service.invalidate(user.id)
         await self.acquired_connection.execute('''
             UPDATE bot_user
             SET (username, first_name, last_name, is_user_in_chat, last_seen) = 
@@ -1240,19 +1844,11 @@ class DatabaseManager:
 
     async def dump_chat(self, chat: Chat) -> None:
         if chat.type in [ChatType.GROUP, ChatType.SUPERGROUP]:
-            await self.acquired_connection.execute('''
-                INSERT INTO chat (clan_tag, chat_id, type, title)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (clan_tag, chat_id)
-                DO UPDATE SET (type, title) = ($3, $4)
-            ''', self.clan_tag, chat.id, chat.type, chat.title)
+            await self.write_behind_buffer.put_group_chat(chat.id, chat.type, chat.title)
         elif chat.type == ChatType.PRIVATE:
-            await self.acquired_connection.execute('''
-                INSERT INTO chat (clan_tag, chat_id, type, username, first_name, last_name)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                ON CONFLICT (clan_tag, chat_id)
-                DO UPDATE SET (type, username, first_name, last_name) = ($3, $4, $5, $6)
-            ''', self.clan_tag, chat.id, chat.type, chat.username, chat.first_name, chat.last_name)
+            await self.write_behind_buffer.put_private_chat(
+                chat.id, chat.type, chat.username, chat.first_name, chat.last_name
+            )
 
     def load_name(self, player_tag: str) -> str:
         return self.name.get(player_tag, player_tag)
@@ -1303,26 +1899,75 @@ class DatabaseManager:
         return text
 
     async def dump_message_owner(self, message: Message, user: User) -> None:
-        await self.acquired_connection.execute('''
-            INSERT INTO message_bot_user (clan_tag, chat_id, message_id, user_id)
-            VALUES ($1, $2, $3, $4)
-        ''', self.clan_tag, message.chat.id, message.message_id, user.id)
-
-    async def is_user_message_owner(self, message: Message, user: User) -> bool:
-        row = await self.acquired_connection.fetchrow('''
+        self.cache_message_owner(message.chat.id, message.message_id, user.id)
+        self.write_behind_buffer.put_message_owner(message.chat.id, message.message_id, user.id)
+
+    def cache_message_owner(self, chat_id: int, message_id: int, user_id: Optional[int]) -> None:
+        MAX_MESSAGE_OWNERS = 10000
+        self.message_owners[(chat_id, message_id)] = user_id
+        self.message_owners.move_to_end((chat_id, message_id))
+        if len(self.message_owners) > MAX_MESSAGE_OWNERS:
+            self.message_owners.popitem(last=False)
+
+    async def load_message_owner_id(self, message: Message) -> Optional[int]:
+        key = (message.chat.id, message.message_id)
+        if key in self.message_owners:
+            self.message_owners.move_to_end(key)
+            return self.message_owners[key]
+        user_id = await self.acquired_connection.fetchval('''
             SELECT user_id
             FROM message_bot_user
             WHERE (clan_tag, chat_id, message_id) = ($1, $2, $3)
         ''', self.clan_tag, message.chat.id, message.message_id)
-        return row is not None and row['user_id'] == user.id
+        self.cache_message_owner(message.chat.id, message.message_id, user_id)
+        return user_id
+
+    async def is_user_message_owner(self, message: Message, user: User) -> bool:
+        user_id = await self.load_message_owner_id(message)
+        return user_id is not None and user_id == user.id
 
     async def get_message_owner(self, message: Message) -> BotUser:
-        row = await self.acquired_connection.fetchrow('''
-            SELECT chat_id, user_id
-            FROM message_bot_user
-            WHERE (clan_tag, chat_id, message_id) = ($1, $2, $3)
-        ''', self.clan_tag, message.chat.id, message.message_id)
-        return BotUser(chat_id=row['chat_id'], user_id=row['user_id'])
+        return BotUser(chat_id=message.chat.id, user_id=await self.load_message_owner_id(message))
+
+    async def delete_old_message_owners(self) -> None:
+        await self.acquired_connection.execute('''
+            DELETE FROM message_bot_user
+            WHERE clan_tag = $1 AND sent_at < NOW() AT TIME ZONE 'UTC' - INTERVAL '1 day'
+        ''', self.clan_tag)
+
+    @staticmethod
+    def get_rendered_hash(text: str, parse_mode: ParseMode, reply_markup: Optional[InlineKeyboardMarkup]) -> str:
+        return hashlib.sha256(
+            f'{parse_mode}\n{reply_markup.model_dump_json() if reply_markup is not None else ''}\n{text}'.encode('utf-8')
+        ).hexdigest()
+
+    async def edit_message(
+            self, message: Message, text: str, parse_mode: ParseMode, reply_markup: Optional[InlineKeyboardMarkup]
+    ) -> bool:
+        MAX_RENDERED_HASHES = 10000
+        key = (message.chat.id, message.message_id)
+        rendered_hash = self.get_rendered_hash(text, parse_mode, reply_markup)
+        last_rendered_hash = self.rendered_hashes.get(key)
+        if last_rendered_hash is None:
+            last_rendered_hash = await self.acquired_connection.fetchval('''
+                SELECT rendered_hash
+                FROM message_bot_user
+                WHERE (clan_tag, chat_id, message_id) = ($1, $2, $3)
+            ''', self.clan_tag, message.chat.id, message.message_id)
+        if last_rendered_hash == rendered_hash:
+            self.rendered_hashes[key] = rendered_hash
+            self.rendered_hashes.move_to_end(key)
+            return False
+        is_message_edited = False
+        with suppress(TelegramBadRequest):
+            await message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+            is_message_edited = True
+        self.rendered_hashes[key] = rendered_hash
+        self.rendered_hashes.move_to_end(key)
+        if len(self.rendered_hashes) > MAX_RENDERED_HASHES:
+            self.rendered_hashes.popitem(last=False)
+        self.write_behind_buffer.put_rendered_hash(message.chat.id, message.message_id, rendered_hash)
+        return is_message_edited
 
     async def get_group_chat_id(self, message: Message) -> int:
         if message.chat.type in [ChatType.GROUP, ChatType.SUPERGROUP]:
@@ -1331,57 +1976,19 @@ class DatabaseManager:
             return await self.get_main_chat_id()
 
     async def can_user_use_bot(self, user_id: int) -> bool:
-        row = await self.acquired_connection.fetchrow('''
-            SELECT clan_tag, chat_id, user_id
-            FROM bot_user
-            WHERE
-                clan_tag = $1
-                AND (chat_id IN (SELECT chat_id FROM clan_chat WHERE clan_tag = $1)
-                     AND is_user_in_chat
-                     OR can_use_bot_without_clan_group)
-                AND user_id = $2
-        ''', self.clan_tag, user_id)
-        return row is not None
+        return (await self.permission_service.get(user_id, user_id)).can_use_bot
 
     async def can_user_ping_group_members(self, chat_id: int, user_id: int) -> bool:
-        row = await self.acquired_connection.fetchrow('''
-            SELECT clan_tag, chat_id, user_id
-            FROM bot_user
-            WHERE
-                ((clan_tag, chat_id, user_id) = ($1, $2, $3) OR (clan_tag, chat_id, user_id) = ($1, $3, $3))
-                AND can_ping_group_members
-        ''', self.clan_tag, chat_id, user_id)
-        return row is not None
+        return (await self.permission_service.get(chat_id, user_id)).can_ping_group_members
 
     async def can_user_link_group_members(self, chat_id: int, user_id: int) -> bool:
-        row = await self.acquired_connection.fetchrow('''
-            SELECT clan_tag, chat_id, user_id
-            FROM bot_user
-            WHERE
-                ((clan_tag, chat_id, user_id) = ($1, $2, $3) OR (clan_tag, chat_id, user_id) = ($1, $3, $3))
-                AND can_link_group_members
-        ''', self.clan_tag, chat_id, user_id)
-        return row is not None
+        return (await self.permission_service.get(chat_id, user_id)).can_link_group_members
 
     async def can_user_edit_cw_list(self, chat_id: int, user_id: int) -> bool:
-        row = await self.acquired_connection.fetchrow('''
-            SELECT clan_tag, chat_id, user_id
-            FROM bot_user
-            WHERE
-                ((clan_tag, chat_id, user_id) = ($1, $2, $3) OR (clan_tag, chat_id, user_id) = ($1, $3, $3))
-                AND can_edit_cw_list
-        ''', self.clan_tag, chat_id, user_id)
-        return row is not None
+        return (await self.permission_service.get(chat_id, user_id)).can_edit_cw_list
 
     async def can_user_send_messages_from_bot(self, chat_id: int, user_id: int) -> bool:
-        row = await self.acquired_connection.fetchrow('''
-            SELECT clan_tag, chat_id, user_id
-            FROM bot_user
-            WHERE
-                ((clan_tag, chat_id, user_id) = ($1, $2, $3) OR (clan_tag, chat_id, user_id) = ($1, $3, $3))
-                AND can_send_messages_from_bot
-        ''', self.clan_tag, chat_id, user_id)
-        return row is not None
+        return (await self.permission_service.get(chat_id, user_id)).can_send_messages_from_bot
 
     async def is_player_linked_to_user(self, player_tag: str, chat_id: int, user_id: int) -> bool:
         rows = await self.acquired_connection.fetch('''
@@ -1486,16 +2093,18 @@ class DatabaseManager:
                     for user_id_to_ping in user_ids_to_ping
                 )}\n')
         log_text = f'Message "{message_text}" was sent to group {chat_title} ({chat_id})'
-        await self.bot.send_message(
+        await self.outbound_queue.enqueue(
             chat_id=chat_id,
+            user_id=user_id,
             text=message_text,
-            parse_mode=ParseMode.HTML,
-            reply_markup=None
+            description=log_text
         )
+
+    async def log_sent_message(self, message: OutboundMessage) -> None:
         await self.acquired_connection.execute('''
             INSERT INTO action (clan_tag, chat_id, user_id, action_timestamp, description)
             VALUES ($1, $2, $3, NOW() AT TIME ZONE 'UTC', $4)
-        ''', self.clan_tag, user_id, user_id, log_text)
+        ''', self.clan_tag, message.user_id, message.user_id, message.description)
 
     async def set_activity_preparation_message_sent(self, clan_tag: str, name: str, start_time: datetime) -> None:
         await self.acquired_connection.execute('''
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Optional, Callable, Awaitable
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest, TelegramForbiddenError
+
+from async_client.rate_limiter import TokenBucket
+from entities import OutboundMessage
+
+
+class OutboundQueue:
+    MAX_MESSAGE_LENGTH = 4096
+    SEPARATOR = '\n\n'
+
+    def __init__(
+            self,
+            bot: Bot,
+            acquired_connection,
+            clan_tag: str,
+            on_sent: Callable[[OutboundMessage], Awaitable[None]],
+            global_rate: float = 30,
+            group_rate: float = 20 / 60,
+            group_burst: int = 5,
+            private_rate: float = 1,
+            max_attempts: int = 5,
+            max_backoff_seconds: float = 300
+    ):
+        """
+        A queue of messages sent to chats by scheduled jobs.
+        Messages are stored in the database until they are sent, so a failed send is retried later,
+        even after a restart. Pending messages to the same chat are coalesced into a single message.
+
+        :param global_rate: number of messages per second the bot may send in total
+        :param group_rate: number of messages per second the bot may send to a single group
+        :param group_burst: number of messages that may be sent at once to a single group
+        :param private_rate: number of messages per second the bot may send to a single private chat
+        :param max_attempts: number of failed sends after which a message is dropped
+        :param max_backoff_seconds: longest pause before a failed send is retried
+        """
+        self.bot = bot
+        self.acquired_connection = acquired_connection
+        self.clan_tag = clan_tag
+        self.on_sent = on_sent
+        self.global_bucket = TokenBucket(global_rate, int(global_rate))
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.private_rate = private_rate
+        self.max_attempts = max_attempts
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self.chat_buckets = {}
+        self.pending = {}
+        self.paused_until = {}
+        self.worker = None
+        self.wakeup = asyncio.Event()
+
+    async def start(self) -> None:
+        rows = await self.acquired_connection.fetch('''
+            SELECT outbound_message_id, chat_id, user_id, text, description, attempts
+            FROM outbound_message
+            WHERE clan_tag = $1
+            ORDER BY outbound_message_id
+        ''', self.clan_tag)
+        for row in rows:
+            self.pending.setdefault(row['chat_id'], deque()).append(OutboundMessage(**dict(row)))
+        self.wake_up()
+
+    async def enqueue(self, chat_id: int, user_id: Optional[int], text: str, description: str) -> None:
+        outbound_message_id = await self.acquired_connection.fetchval('''
+            INSERT INTO outbound_message (clan_tag, chat_id, user_id, text, description, attempts, created_at)
+            VALUES ($1, $2, $3, $4, $5, 0, NOW() AT TIME ZONE 'UTC')
+            RETURNING outbound_message_id
+        ''', self.clan_tag, chat_id, user_id, text, description)
+        self.pending.setdefault(chat_id, deque()).append(OutboundMessage(
+            outbound_message_id=outbound_message_id,
+            chat_id=chat_id,
+            user_id=user_id,
+            text=text,
+            description=description,
+            attempts=0
+        ))
+        self.wake_up()
+
+    def wake_up(self) -> None:
+        self.wakeup.set()
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.work())
+
+    def queue_depth(self) -> int:
+        return sum(len(messages) for messages in self.pending.values())
+
+    async def work(self) -> None:
+        while self.pending:
+            self.wakeup.clear()
+            delay = await self.send_ready_messages()
+            if delay > 0:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+
+    async def send_ready_messages(self) -> float:
+        delays = []
+        is_any_message_sent = False
+        for chat_id in list(self.pending):
+            pause = self.paused_until.get(chat_id, 0) - time.monotonic()
+            if pause > 0:
+                delays.append(pause)
+                continue
+            chat_bucket = self.get_chat_bucket(chat_id)
+            chat_delay = chat_bucket.delay()
+            if chat_delay > 0:
+                delays.append(chat_delay)
+                continue
+            global_delay = self.global_bucket.delay()
+            if global_delay > 0:
+                return global_delay
+            self.global_bucket.take()
+            chat_bucket.take()
+            await self.send(chat_id, self.coalesce(self.pending[chat_id]))
+            is_any_message_sent = True
+        if is_any_message_sent or not delays:
+            return 0
+        return min(delays)
+
+    def get_chat_bucket(self, chat_id: int) -> TokenBucket:
+        chat_bucket = self.chat_buckets.get(chat_id)
+        if chat_bucket is None:
+            if chat_id < 0:
+                chat_bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                chat_bucket = TokenBucket(self.private_rate, 1)
+            self.chat_buckets[chat_id] = chat_bucket
+        return chat_bucket
+
+    def coalesce(self, messages: deque[OutboundMessage]) -> list[OutboundMessage]:
+        batch = [messages[0]]
+        length = len(messages[0].text)
+        for message in list(messages)[1:]:
+            length += len(self.SEPARATOR) + len(message.text)
+            if length > self.MAX_MESSAGE_LENGTH:
+                break
+            batch.append(message)
+        return batch
+
+    async def send(self, chat_id: int, batch: list[OutboundMessage]) -> None:
+        try:
+            await self.bot.send_message(
+                chat_id=chat_id,
+                text=self.SEPARATOR.join(message.text for message in batch),
+                parse_mode=ParseMode.HTML,
+                reply_markup=None
+            )
+        except TelegramRetryAfter as e:
+            self.paused_until[chat_id] = time.monotonic() + e.retry_after
+        except (TelegramBadRequest, TelegramForbiddenError) as e:
+            print(f'Message to chat {chat_id} was dropped: {e}')
+            await self.remove(chat_id, batch)
+        except Exception as e:
+            await self.retry_later(chat_id, batch, e)
+        else:
+            await self.remove(chat_id, batch)
+            for message in batch:
+                await self.on_sent(message)
+
+    async def retry_later(self, chat_id: int, batch: list[OutboundMessage], error: Exception) -> None:
+        for message in batch:
+            message.attempts += 1
+        attempts = max(message.attempts for message in batch)
+        if attempts >= self.max_attempts:
+            print(f'Message to chat {chat_id} was dropped after {attempts} attempts: {error}')
+            await self.remove(chat_id, batch)
+            return
+        self.paused_until[chat_id] = time.monotonic() + min(2 ** attempts, self.max_backoff_seconds)
+        await self.acquired_connection.execute('''
+            UPDATE outbound_message
+            SET attempts = attempts + 1
+            WHERE outbound_message_id = any($1::bigint[])
+        ''', [message.outbound_message_id for message in batch])
+
+    async def remove(self, chat_id: int, batch: list[OutboundMessage]) -> None:
+        messages = self.pending[chat_id]
+        for _ in batch:
+            messages.popleft()
+        if not messages:
+            del self.pending[chat_id]
+        await self.acquired_connection.execute('''
+            DELETE FROM outbound_message
+            WHERE outbound_message_id = any($1::bigint[])
+        ''', [message.outbound_message_id for message in batch])
@@ -0,0 +1,53 @@
+import time
+from typing import Optional
+
+from entities import Permissions
+
+
+class PermissionService:
+    def __init__(self, acquired_connection, clan_tag: str, ttl_seconds: float = 300):
+        """
+        A cache of users' permissions, loaded with a single query per user and chat
+
+        :param ttl_seconds: number of seconds permissions are cached for, which bounds staleness
+            of flags changed directly in the database
+        """
+        self.acquired_connection = acquired_connection
+        self.clan_tag = clan_tag
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+
+    async def get(self, chat_id: int, user_id: int) -> Permissions:
+        entry = self.entries.get((chat_id, user_id))
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        permissions = await self.load(chat_id, user_id)
+        self.entries[(chat_id, user_id)] = (time.monotonic() + self.ttl_seconds, permissions)
+        return permissions
+
+    async def load(self, chat_id: int, user_id: int) -> Permissions:
+        row = await self.acquired_connection.fetchrow('''
+            SELECT
+                coalesce(bool_or(
+                    chat_id IN (SELECT chat_id FROM clan_chat WHERE clan_tag = $1) AND is_user_in_chat
+                    OR can_use_bot_without_clan_group
+                ), FALSE) AS can_use_bot,
+                coalesce(bool_or(can_ping_group_members) FILTER (WHERE chat_id IN ($2, $3)), FALSE)
+                    AS can_ping_group_members,
+                coalesce(bool_or(can_link_group_members) FILTER (WHERE chat_id IN ($2, $3)), FALSE)
+                    AS can_link_group_members,
+                coalesce(bool_or(can_edit_cw_list) FILTER (WHERE chat_id IN ($2, $3)), FALSE)
+                    AS can_edit_cw_list,
+                coalesce(bool_or(can_send_messages_from_bot) FILTER (WHERE chat_id IN ($2, $3)), FALSE)
+                    AS can_send_messages_from_bot
+            FROM bot_user
+            WHERE clan_tag = $1 AND user_id = $3
+        ''', self.clan_tag, chat_id, user_id)
+        return Permissions(**dict(row))
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        if user_id is None:
+            self.entries.clear()
+            return
+        for key in [key for key in self.entries if key[1] == user_id]:
+            del self.entries[key]
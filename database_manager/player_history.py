@@ -0,0 +1,208 @@
+import re
+import time
+from datetime import datetime, timedelta, UTC
+
+
+class PlayerHistory:
+    COLUMNS = (
+        'town_hall_level', 'builder_hall_level',
+        'home_village_trophies', 'builder_base_trophies',
+        'barbarian_king_level', 'archer_queen_level', 'minion_prince_level',
+        'grand_warden_level', 'royal_champion_level', 'dragon_duke_level',
+        'capital_gold_contributed', 'donations_given', 'donations_received'
+    )
+    PARTITION_NAME_PATTERN = re.compile(r'player_history_(\d{4})_(\d{2})$')
+    SECONDS_IN_DAY = 24 * 60 * 60
+
+    def __init__(
+            self,
+            acquired_connection,
+            clan_tag: str,
+            retention_days: int = 365,
+            downsample_after_days: int = 30
+    ):
+        """
+        An append-only history of players' stats, partitioned by month.
+        A row is written only when a player's stats change and holds only the changed stats,
+        other columns are NULL. The first row of a player, and the first row of the oldest kept month,
+        holds all stats, so any past value is the latest non-NULL value written at or before that time.
+        Maintenance is done for all clans at once, since partitions are shared between them.
+
+        :param retention_days: number of days history is kept for, rounded up to a whole month
+        :param downsample_after_days: number of days after which history is downsampled to a row per day
+        """
+        self.acquired_connection = acquired_connection
+        self.clan_tag = clan_tag
+        self.retention_days = retention_days
+        self.downsample_after_days = downsample_after_days
+
+        self.latest_snapshots = None
+        self.last_maintained_at = None
+
+    @classmethod
+    def latest_values(cls) -> str:
+        return ',\n'.join(
+            f'(array_agg({column} ORDER BY recorded_at DESC) FILTER (WHERE {column} IS NOT NULL))[1] AS {column}'
+            for column in cls.COLUMNS
+        )
+
+    async def record(self, snapshots: dict[str, tuple]) -> None:
+        if self.latest_snapshots is None:
+            await self.load_latest_snapshots()
+        recorded_at = datetime.now(UTC).replace(tzinfo=None)
+        rows = []
+        for player_tag, snapshot in snapshots.items():
+            latest_snapshot = self.latest_snapshots.get(player_tag)
+            if latest_snapshot == snapshot:
+                continue
+            if latest_snapshot is None:
+                rows.append((self.clan_tag, player_tag, recorded_at, *snapshot))
+            else:
+                rows.append((
+                    self.clan_tag, player_tag, recorded_at,
+                    *(
+                        value if value != latest_value else None
+                        for value, latest_value in zip(snapshot, latest_snapshot)
+                    )
+                ))
+        if len(rows) == 0:
+            return
+        await self.acquired_connection.executemany(f'''
+            INSERT INTO player_history (clan_tag, player_tag, recorded_at, {', '.join(self.COLUMNS)})
+            VALUES ({', '.join(f'${i}' for i in range(1, len(self.COLUMNS) + 4))})
+            ON CONFLICT (clan_tag, player_tag, recorded_at) DO NOTHING
+        ''', rows)
+        for player_tag, snapshot in snapshots.items():
+            self.latest_snapshots[player_tag] = snapshot
+
+    async def load_latest_snapshots(self) -> None:
+        rows = await self.acquired_connection.fetch(f'''
+            SELECT player_tag, {self.latest_values()}
+            FROM player_history
+            WHERE clan_tag = $1
+            GROUP BY player_tag
+        ''', self.clan_tag)
+        self.latest_snapshots = {
+            row['player_tag']: tuple(row[column] for column in self.COLUMNS) for row in rows
+        }
+
+    async def load_progress(self, days: int) -> dict[str, dict[str, int]]:
+        """
+        Changes of stats of players who are in the clan over the last days.
+        Progress of players who have no history that old is counted since their first row.
+        """
+        since = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=days)
+        first_values = ',\n'.join(
+            f'(array_agg({column} ORDER BY recorded_at) FILTER (WHERE {column} IS NOT NULL))[1] AS first_{column}'
+            for column in self.COLUMNS
+        )
+        old_values = ',\n'.join(
+            f'(array_agg({column} ORDER BY recorded_at DESC) '
+            f'FILTER (WHERE {column} IS NOT NULL AND recorded_at <= $2))[1] AS old_{column}'
+            for column in self.COLUMNS
+        )
+        rows = await self.acquired_connection.fetch(f'''
+            SELECT player_tag, {self.latest_values()}, {first_values}, {old_values}
+            FROM player_history
+            WHERE clan_tag = $1 AND player_tag IN (
+                SELECT player_tag
+                FROM player
+                WHERE clan_tag = $1 AND is_player_in_clan
+            )
+            GROUP BY player_tag
+        ''', self.clan_tag, since)
+        return {
+            row['player_tag']: {
+                column: row[column] - (
+                    row[f'old_{column}'] if row[f'old_{column}'] is not None else row[f'first_{column}']
+                )
+                for column in self.COLUMNS
+            }
+            for row in rows
+        }
+
+    async def maintain(self) -> None:
+        if self.last_maintained_at is not None and time.monotonic() - self.last_maintained_at < self.SECONDS_IN_DAY:
+            return
+        await self.create_partitions()
+        await self.downsample()
+        await self.drop_old_partitions()
+        self.last_maintained_at = time.monotonic()
+
+    @staticmethod
+    def get_month_start(moment: datetime, months_later: int = 0) -> datetime:
+        month_index = moment.year * 12 + moment.month - 1 + months_later
+        return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+    async def create_partitions(self) -> None:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        for months_later in (0, 1):
+            month_start = self.get_month_start(now, months_later)
+            next_month_start = self.get_month_start(now, months_later + 1)
+            await self.acquired_connection.execute(f'''
+                CREATE TABLE IF NOT EXISTS player_history_{month_start:%Y_%m}
+                PARTITION OF player_history
+                FOR VALUES FROM ('{month_start:%Y-%m-%d}') TO ('{next_month_start:%Y-%m-%d}')
+            ''')
+
+    async def downsample(self) -> None:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        downsample_before = (now - timedelta(days=self.downsample_after_days)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        await self.acquired_connection.execute(f'''
+            UPDATE player_history
+            SET ({', '.join(self.COLUMNS)}) = ({', '.join(f'merged.{column}' for column in self.COLUMNS)})
+            FROM (
+                SELECT clan_tag, player_tag, max(recorded_at) AS recorded_at, {self.latest_values()}
+                FROM player_history
+                WHERE recorded_at < $1
+                GROUP BY clan_tag, player_tag, date_trunc('day', recorded_at)
+                HAVING count(*) > 1
+            ) AS merged
+            WHERE (player_history.clan_tag, player_history.player_tag, player_history.recorded_at)
+                = (merged.clan_tag, merged.player_tag, merged.recorded_at)
+        ''', downsample_before)
+        await self.acquired_connection.execute('''
+            DELETE FROM player_history
+            WHERE recorded_at < $1 AND EXISTS (
+                SELECT 1
+                FROM player_history AS later_player_history
+                WHERE
+                    (later_player_history.clan_tag, later_player_history.player_tag)
+                        = (player_history.clan_tag, player_history.player_tag)
+                    AND later_player_history.recorded_at > player_history.recorded_at
+                    AND later_player_history.recorded_at
+                        < date_trunc('day', player_history.recorded_at) + INTERVAL '1 day'
+            )
+        ''', downsample_before)
+
+    async def drop_old_partitions(self) -> None:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        keep_since = self.get_month_start(now - timedelta(days=self.retention_days))
+        partition_names = await self.acquired_connection.fetch('''
+            SELECT inhrelid::regclass::text AS partition_name
+            FROM pg_inherits
+            WHERE inhparent = 'player_history'::regclass
+        ''')
+        old_partition_names = []
+        for row in partition_names:
+            match = self.PARTITION_NAME_PATTERN.search(row['partition_name'])
+            if match is not None and datetime(int(match[1]), int(match[2]), 1) < keep_since:
+                old_partition_names.append(row['partition_name'])
+        if len(old_partition_names) == 0:
+            return
+        await self.acquired_connection.execute(f'''
+            INSERT INTO player_history (clan_tag, player_tag, recorded_at, {', '.join(self.COLUMNS)})
+            SELECT clan_tag, player_tag, $1, {self.latest_values()}
+            FROM player_history
+            WHERE recorded_at <= $1
+            GROUP BY clan_tag, player_tag
+            ON CONFLICT (clan_tag, player_tag, recorded_at) DO UPDATE SET
+                ({', '.join(self.COLUMNS)}) =
+                ({', '.join(f'coalesce(player_history.{column}, excluded.{column})' for column in self.COLUMNS)})
+        ''', keep_since)
+        for partition_name in old_partition_names:
+            await self.acquired_connection.execute(f'''
+                DROP TABLE {partition_name}
+            ''')
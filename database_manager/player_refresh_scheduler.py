@@ -0,0 +1,51 @@
+import math
+from datetime import datetime, UTC
+
+
+class PlayerRefreshScheduler:
+    def __init__(
+            self,
+            acquired_connection,
+            clan_tag: str,
+            tick_seconds: float,
+            member_refresh_seconds: float = 3600,
+            war_member_refresh_seconds: float = 0
+    ):
+        """
+        Chooses clan members whose data is retrieved on a tick, so that the whole clan is not retrieved at once.
+        Players who were never retrieved are always chosen, war members are chosen as soon as their data is older
+        than war_member_refresh_seconds, other members are chosen stalest first,
+        no more of them than it takes to refresh the whole clan once per member_refresh_seconds.
+
+        :param tick_seconds: number of seconds between ticks
+        :param member_refresh_seconds: number of seconds after which data of a member is refreshed
+        :param war_member_refresh_seconds: number of seconds after which data of a war member is refreshed
+        """
+        self.acquired_connection = acquired_connection
+        self.clan_tag = clan_tag
+        self.tick_seconds = tick_seconds
+        self.member_refresh_seconds = member_refresh_seconds
+        self.war_member_refresh_seconds = war_member_refresh_seconds
+
+    async def choose(self, clan_member_tags: list[str], war_member_tags: set[str]) -> list[str]:
+        rows = await self.acquired_connection.fetch('''
+            SELECT player_tag, refreshed_at
+            FROM player
+            WHERE clan_tag = $1 AND player_tag = any($2::varchar[]) AND refreshed_at IS NOT NULL
+        ''', self.clan_tag, clan_member_tags)
+        now = datetime.now(UTC).replace(tzinfo=None)
+        ages = {row['player_tag']: (now - row['refreshed_at']).total_seconds() for row in rows}
+        chosen_player_tags = []
+        stale_player_tags = []
+        for player_tag in clan_member_tags:
+            age = ages.get(player_tag)
+            if age is None:
+                chosen_player_tags.append(player_tag)
+            elif player_tag in war_member_tags:
+                if age >= self.war_member_refresh_seconds:
+                    chosen_player_tags.append(player_tag)
+            elif age >= self.member_refresh_seconds:
+                stale_player_tags.append(player_tag)
+        stale_player_tags.sort(key=lambda player_tag: ages[player_tag], reverse=True)
+        shard_size = math.ceil(len(clan_member_tags) * self.tick_seconds / self.member_refresh_seconds)
+        return chosen_player_tags + stale_player_tags[:shard_size]
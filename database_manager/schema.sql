@@ -145,22 +145,24 @@ create table clan_games
 
 create table clan_war
 (
-    clan_tag   varchar(16) not null
+    clan_tag         varchar(16) not null
         constraint clan_war_clan_clan_tag_fk
             references clan,
-    start_time timestamp   not null,
-    data       jsonb       not null,
+    start_time       timestamp   not null,
+    data             jsonb       not null,
+    data_fingerprint varchar(64),
     constraint clan_war_pk
         primary key (clan_tag, start_time)
 );
 
 create table clan_war_league
 (
-    clan_tag varchar(16) not null
+    clan_tag         varchar(16) not null
         constraint clan_war_league_clan_clan_tag_fk
             references clan,
-    season   varchar(16) not null,
-    data     jsonb       not null,
+    season           varchar(16) not null,
+    data             jsonb       not null,
+    data_fingerprint varchar(64),
     constraint clan_war_league_pk
         primary key (clan_tag, season)
 );
@@ -210,6 +212,34 @@ create table clan_war_league_war
         primary key (clan_tag, war_tag)
 );
 
+create index clan_war_league_war_clan_tag_season_clan_tag_index
+    on clan_war_league_war (clan_tag, season, ((data -> 'clan' ->> 'tag')));
+
+create index clan_war_league_war_clan_tag_season_opponent_tag_index
+    on clan_war_league_war (clan_tag, season, ((data -> 'opponent' ->> 'tag')));
+
+create table clan_war_league_war_rating
+(
+    clan_tag                       varchar(16) not null,
+    war_tag                        varchar(16) not null,
+    season                         varchar(16) not null,
+    day                            integer     not null,
+    player_tag                     varchar(16) not null,
+    war_state                      varchar(16) not null,
+    attack_new_stars               integer,
+    attack_destruction_percentage  integer,
+    attack_map_position            integer,
+    defense_stars                  integer,
+    defense_destruction_percentage integer,
+    constraint clan_war_league_war_rating_pk
+        primary key (clan_tag, war_tag, player_tag),
+    constraint clan_war_league_war_rating_clan_war_league_war_clan_tag_war_tag_fk
+        foreign key (clan_tag, war_tag) references clan_war_league_war
+);
+
+create index clan_war_league_war_rating_clan_tag_season_index
+    on clan_war_league_war_rating (clan_tag, season);
+
 create table clan_war_log
 (
     clan_tag varchar(16) not null
@@ -218,6 +248,17 @@ create table clan_war_log
     data     jsonb       not null
 );
 
+create table hero_equipment_ore_cost
+(
+    max_level  integer not null,
+    level      integer not null,
+    shiny_ore  integer not null,
+    glowy_ore  integer not null,
+    starry_ore integer not null,
+    constraint hero_equipment_ore_cost_pk
+        primary key (max_level, level)
+);
+
 create table ingore_updates_player
 (
     clan_tag   varchar(16) not null,
@@ -230,10 +271,12 @@ create table ingore_updates_player
 
 create table message_bot_user
 (
-    clan_tag   varchar(16) not null,
-    chat_id    bigint      not null,
-    message_id bigint      not null,
-    user_id    bigint,
+    clan_tag      varchar(16) not null,
+    chat_id       bigint      not null,
+    message_id    bigint      not null,
+    user_id       bigint,
+    rendered_hash varchar(64),
+    sent_at       timestamp,
     constraint message_bot_user_pk
         unique (clan_tag, chat_id, message_id, user_id),
     constraint message_bot_user_bot_user_clan_tag_chat_id_user_id_fk
@@ -252,10 +295,27 @@ create table opponent_player
     grand_warden_level   integer     not null,
     royal_champion_level integer     not null,
     dragon_duke_level    integer     not null,
+    refreshed_at         timestamp,
     constraint opponent_player_pk
         primary key (clan_tag, player_tag)
 );
 
+create table outbound_message
+(
+    outbound_message_id bigserial   not null
+        constraint outbound_message_pk
+            primary key,
+    clan_tag            varchar(16) not null
+        constraint outbound_message_clan_clan_tag_fk
+            references clan,
+    chat_id             bigint      not null,
+    user_id             bigint,
+    text                text        not null,
+    description         text        not null,
+    attempts            integer     not null,
+    created_at          timestamp   not null
+);
+
 create table player
 (
     clan_tag                          varchar(16) not null
@@ -284,6 +344,7 @@ create table player
     donations_received                integer     not null,
     first_seen                        timestamp,
     last_seen                         timestamp   not null,
+    refreshed_at                      timestamp,
     constraint player_pk
         primary key (clan_tag, player_tag)
 );
@@ -302,13 +363,55 @@ create table player_bot_user
         foreign key (clan_tag, player_tag) references player
 );
 
+create table player_hero_equipment
+(
+    clan_tag   varchar(16) not null,
+    player_tag varchar(16) not null,
+    name       varchar(32) not null,
+    level      integer     not null,
+    max_level  integer     not null,
+    constraint player_hero_equipment_pk
+        primary key (clan_tag, player_tag, name),
+    constraint player_hero_equipment_player_clan_tag_player_tag_fk
+        foreign key (clan_tag, player_tag) references player
+);
+
+create index player_hero_equipment_clan_tag_name_level_index
+    on player_hero_equipment (clan_tag, name, level);
+
+create table player_history
+(
+    clan_tag                 varchar(16) not null,
+    player_tag               varchar(16) not null,
+    recorded_at              timestamp   not null,
+    town_hall_level          integer,
+    builder_hall_level       integer,
+    home_village_trophies    integer,
+    builder_base_trophies    integer,
+    barbarian_king_level     integer,
+    archer_queen_level       integer,
+    minion_prince_level      integer,
+    grand_warden_level       integer,
+    royal_champion_level     integer,
+    dragon_duke_level        integer,
+    capital_gold_contributed integer,
+    donations_given          integer,
+    donations_received       integer,
+    constraint player_history_pk
+        primary key (clan_tag, player_tag, recorded_at),
+    constraint player_history_player_clan_tag_player_tag_fk
+        foreign key (clan_tag, player_tag) references player
+)
+    partition by range (recorded_at);
+
 create table raid_weekend
 (
-    clan_tag   varchar(16) not null
+    clan_tag         varchar(16) not null
         constraint raid_weekend_clan_clan_tag_fk
             references clan,
-    start_time timestamp   not null,
-    data       jsonb       not null,
+    start_time       timestamp   not null,
+    data             jsonb       not null,
+    data_fingerprint varchar(64),
     constraint raid_weekend_pk
         primary key (clan_tag, start_time)
 );
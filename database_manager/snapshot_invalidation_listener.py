@@ -0,0 +1,80 @@
+import asyncio
+import json
+from typing import Any, Callable
+
+import asyncpg
+from asyncpg import Connection
+
+
+class SnapshotInvalidationListener:
+    CHANNEL = 'snapshot_invalidation'
+
+    def __init__(self, connection_parameters: dict[str, Any], max_reconnection_delay_seconds: float = 60):
+        """
+        A single connection listening to snapshot invalidations of all clans,
+        every invalidation is passed to the subscriber of its clan.
+        If the connection is lost, it is opened again and subscribers are told to drop all their snapshots,
+        since invalidations sent in the meantime are missed.
+
+        :param connection_parameters: parameters of the connection, which is opened outside any pool
+        :param max_reconnection_delay_seconds: longest pause between attempts to open the connection again
+        """
+        self.connection_parameters = connection_parameters
+        self.max_reconnection_delay_seconds = max_reconnection_delay_seconds
+        self.connection = None
+        self.subscribers = {}
+        self.reconnection = None
+        self.is_closed = False
+
+    async def start(self) -> None:
+        await self.connect()
+
+    async def connect(self) -> None:
+        self.connection = await asyncpg.connect(**self.connection_parameters)
+        self.connection.add_termination_listener(self.on_termination)
+        await self.connection.add_listener(self.CHANNEL, self.on_notification)
+
+    def subscribe(
+            self, clan_tag: str, on_invalidation: Callable[[dict], None], on_connection_loss: Callable[[], None]
+    ) -> None:
+        self.subscribers[clan_tag] = (on_invalidation, on_connection_loss)
+
+    def on_notification(self, connection: Connection, pid: int, channel: str, payload: str) -> None:
+        invalidation = json.loads(payload)
+        subscriber = self.subscribers.get(invalidation['clan_tag'])
+        if subscriber is not None:
+            on_invalidation, _ = subscriber
+            on_invalidation(invalidation)
+
+    def on_termination(self, connection: Connection) -> None:
+        if self.is_closed or connection is not self.connection:
+            return
+        print('Snapshot invalidation listener lost its connection, reconnecting')
+        self.notify_connection_loss()
+        if self.reconnection is None or self.reconnection.done():
+            self.reconnection = asyncio.create_task(self.reconnect())
+
+    async def reconnect(self) -> None:
+        delay = 1
+        while not self.is_closed:
+            try:
+                await self.connect()
+            except Exception as e:
+                print(f'Snapshot invalidation listener failed to reconnect: {e}')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnection_delay_seconds)
+            else:
+                self.notify_connection_loss()
+                return
+
+    def notify_connection_loss(self) -> None:
+        for _, on_connection_loss in self.subscribers.values():
+            on_connection_loss()
+
+    async def close(self) -> None:
+        self.is_closed = True
+        if self.reconnection is not None:
+            self.reconnection.cancel()
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
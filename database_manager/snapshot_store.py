@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Optional, Any, Callable, Awaitable
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    value: Any
+
+
+class SnapshotStore:
+    def __init__(self):
+        """
+        An in-memory store of decoded current events. Every stored value gets a new version number,
+        so readers can tell whether anything has changed since they last looked.
+        Stored values are shared between readers and must not be modified.
+        """
+        self.snapshots = {}
+        self.last_version = 0
+        self.invalidation_counts = {}
+        self.full_invalidation_count = 0
+
+    def get(self, name: str) -> Optional[Snapshot]:
+        return self.snapshots.get(name)
+
+    async def load(self, name: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        snapshot = self.snapshots.get(name)
+        if snapshot is not None:
+            return snapshot.value
+        invalidation_count = self.invalidation_counts.get(name, 0)
+        full_invalidation_count = self.full_invalidation_count
+        value = await loader()
+        if (
+                self.invalidation_counts.get(name, 0) == invalidation_count
+                and self.full_invalidation_count == full_invalidation_count
+        ):
+            self.set(name, value)
+        return value
+
+    def set(self, name: str, value: Any) -> Snapshot:
+        self.last_version += 1
+        snapshot = Snapshot(version=self.last_version, value=value)
+        self.snapshots[name] = snapshot
+        return snapshot
+
+    def invalidate(self, *names: str) -> None:
+        for name in names:
+            self.snapshots.pop(name, None)
+            self.invalidation_counts[name] = self.invalidation_counts.get(name, 0) + 1
+
+    def invalidate_all(self) -> None:
+        self.snapshots.clear()
+        self.full_invalidation_count += 1
+
+    def version(self, name: str) -> Optional[int]:
+        snapshot = self.snapshots.get(name)
+        return snapshot.version if snapshot is not None else None
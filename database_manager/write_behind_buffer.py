@@ -0,0 +1,199 @@
+import asyncio
+import time
+from datetime import datetime, UTC
+from typing import Optional
+
+
+class WriteBehindBuffer:
+    def __init__(
+            self,
+            acquired_connection,
+            clan_tag: str,
+            flush_interval_seconds: float = 30,
+            last_seen_window_seconds: float = 300
+    ):
+        """
+        A buffer of chat and user upserts made for every incoming message and of owners and rendered content
+        of bot replies.
+        Chats and users that are not known to be in the database are written at once, so that foreign keys hold,
+        later changes are kept in memory and written in batches.
+
+        :param flush_interval_seconds: number of seconds changes are kept in memory before they are written
+        :param last_seen_window_seconds: number of seconds within which a user's last_seen is not updated
+            if nothing else about the user has changed
+        """
+        self.acquired_connection = acquired_connection
+        self.clan_tag = clan_tag
+        self.flush_interval_seconds = flush_interval_seconds
+        self.last_seen_window_seconds = last_seen_window_seconds
+
+        self.pending_group_chats = {}
+        self.pending_private_chats = {}
+        self.pending_users = {}
+        self.pending_message_owners = []
+        self.pending_rendered_hashes = {}
+        self.written_chats = {}
+        self.written_users = {}
+        self.flusher = None
+
+    async def put_group_chat(self, chat_id: int, chat_type: str, title: Optional[str]) -> None:
+        row = (self.clan_tag, chat_id, chat_type, title)
+        if self.written_chats.get(chat_id) == row:
+            return
+        if chat_id not in self.written_chats:
+            await self.write_group_chats([row])
+            return
+        self.pending_private_chats.pop(chat_id, None)
+        self.pending_group_chats[chat_id] = row
+        self.schedule_flush()
+
+    async def put_private_chat(
+            self,
+            chat_id: int,
+            chat_type: str,
+            username: Optional[str],
+            first_name: Optional[str],
+            last_name: Optional[str]
+    ) -> None:
+        row = (self.clan_tag, chat_id, chat_type, username, first_name, last_name)
+        if self.written_chats.get(chat_id) == row:
+            return
+        if chat_id not in self.written_chats:
+            await self.write_private_chats([row])
+            return
+        self.pending_group_chats.pop(chat_id, None)
+        self.pending_private_chats[chat_id] = row
+        self.schedule_flush()
+
+    async def put_user(
+            self, chat_id: int, user_id: int, username: Optional[str], first_name: str, last_name: Optional[str]
+    ) -> None:
+        key = (chat_id, user_id)
+        now = time.monotonic()
+        row = (self.clan_tag, chat_id, user_id, username, first_name, last_name, datetime.now(UTC).replace(tzinfo=None))
+        written_user = self.written_users.get(key)
+        if written_user is None:
+            await self.write_users([row])
+            self.written_users[key] = (row[:6], now)
+            return
+        written_row, written_at = written_user
+        if written_row == row[:6] and now - written_at < self.last_seen_window_seconds:
+            return
+        self.written_users[key] = (row[:6], now)
+        self.pending_users[key] = row
+        self.schedule_flush()
+
+    def put_message_owner(self, chat_id: int, message_id: int, user_id: int) -> None:
+        self.pending_message_owners.append(
+            (self.clan_tag, chat_id, message_id, user_id, datetime.now(UTC).replace(tzinfo=None))
+        )
+        self.schedule_flush()
+
+    def put_rendered_hash(self, chat_id: int, message_id: int, rendered_hash: str) -> None:
+        self.pending_rendered_hashes[(chat_id, message_id)] = (self.clan_tag, chat_id, message_id, rendered_hash)
+        self.schedule_flush()
+
+    def discard_user(self, chat_id: int, user_id: int) -> None:
+        self.pending_users.pop((chat_id, user_id), None)
+        self.written_users.pop((chat_id, user_id), None)
+
+    def schedule_flush(self) -> None:
+        if self.flusher is None or self.flusher.done():
+            self.flusher = asyncio.create_task(self.flush_later())
+
+    async def flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval_seconds)
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f'Buffered writes failed and will be retried: {e}')
+            self.flusher = None
+            self.schedule_flush()
+
+    async def flush(self) -> None:
+        group_chats, self.pending_group_chats = self.pending_group_chats, {}
+        private_chats, self.pending_private_chats = self.pending_private_chats, {}
+        users, self.pending_users = self.pending_users, {}
+        message_owners, self.pending_message_owners = self.pending_message_owners, []
+        rendered_hashes, self.pending_rendered_hashes = self.pending_rendered_hashes, {}
+        try:
+            if group_chats:
+                await self.write_group_chats(list(group_chats.values()))
+                group_chats = {}
+            if private_chats:
+                await self.write_private_chats(list(private_chats.values()))
+                private_chats = {}
+            if users:
+                await self.write_users(list(users.values()))
+                users = {}
+            if message_owners:
+                await self.write_message_owners(message_owners)
+                message_owners = []
+            if rendered_hashes:
+                await self.write_rendered_hashes(list(rendered_hashes.values()))
+                rendered_hashes = {}
+        finally:
+            self.pending_group_chats = {
+                **{
+                    chat_id: row for chat_id, row in group_chats.items()
+                    if chat_id not in self.pending_private_chats
+                },
+                **self.pending_group_chats
+            }
+            self.pending_private_chats = {
+                **{
+                    chat_id: row for chat_id, row in private_chats.items()
+                    if chat_id not in self.pending_group_chats
+                },
+                **self.pending_private_chats
+            }
+            self.pending_users = {**users, **self.pending_users}
+            self.pending_message_owners = message_owners + self.pending_message_owners
+            self.pending_rendered_hashes = {**rendered_hashes, **self.pending_rendered_hashes}
+
+    async def write_group_chats(self, rows: list[tuple]) -> None:
+        await self.acquired_connection.executemany('''
+            INSERT INTO chat (clan_tag, chat_id, type, title)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (clan_tag, chat_id)
+            DO UPDATE SET (type, title) = ($3, $4)
+        ''', rows)
+        for row in rows:
+            self.written_chats[row[1]] = row
+
+    async def write_private_chats(self, rows: list[tuple]) -> None:
+        await self.acquired_connection.executemany('''
+            INSERT INTO chat (clan_tag, chat_id, type, username, first_name, last_name)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (clan_tag, chat_id)
+            DO UPDATE SET (type, username, first_name, last_name) = ($3, $4, $5, $6)
+        ''', rows)
+        for row in rows:
+            self.written_chats[row[1]] = row
+
+    async def write_users(self, rows: list[tuple]) -> None:
+        await self.acquired_connection.executemany('''
+            INSERT INTO bot_user
+                (clan_tag, chat_id, user_id,
+                username, first_name, last_name, is_user_in_chat, first_seen, last_seen)
+            VALUES
+                ($1, $2, $3, $4, $5, $6, TRUE, $7, $7)
+            ON CONFLICT
+                (clan_tag, chat_id, user_id)
+            DO UPDATE SET
+                (username, first_name, last_name, is_user_in_chat, last_seen) =
+                ($4, $5, $6, TRUE, $7)
+        ''', rows)
+
+    async def write_message_owners(self, rows: list[tuple]) -> None:
+        await self.acquired_connection.executemany('''
+            INSERT INTO message_bot_user (clan_tag, chat_id, message_id, user_id, sent_at)
+            VALUES ($1, $2, $3, $4, $5)
+        ''', rows)
+
+    async def write_rendered_hashes(self, rows: list[tuple]) -> None:
+        await self.acquired_connection.executemany('''
+            UPDATE message_bot_user
+            SET rendered_hash = $4
+            WHERE (clan_tag, chat_id, message_id) = ($1, $2, $3)
+        ''', rows)
@@ -1,6 +1,9 @@
 from entities.bot_entities import (
     BotUser,
-    CommandSettings
+    CommandSettings,
+    MiddlewareMetadata,
+    OutboundMessage,
+    Permissions
 )
 
 from entities.game_entities import (
@@ -10,5 +13,10 @@ from entities.game_entities import (
     ClanWarLeagueWar,
     RaidsAttack,
     RaidsMember,
-    WarMember
+    WarAttack,
+    WarAttackStats,
+    WarMember,
+    WarView,
+    WarViewMember,
+    WarViewSide
 )
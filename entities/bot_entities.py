@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -13,3 +14,30 @@ class CommandSettings:
 class BotUser:
     chat_id: int
     user_id: int
+
+
+@dataclass
+class OutboundMessage:
+    outbound_message_id: int
+    chat_id: int
+    user_id: Optional[int]
+    text: str
+    description: str
+    attempts: int
+
+
+@dataclass(frozen=True)
+class MiddlewareMetadata:
+    bot_username: str
+    clan_name: str
+    linked_chat_ids: frozenset[int]
+    is_privacy_mode_enabled: bool
+
+
+@dataclass(frozen=True)
+class Permissions:
+    can_use_bot: bool
+    can_ping_group_members: bool
+    can_link_group_members: bool
+    can_edit_cw_list: bool
+    can_send_messages_from_bot: bool
@@ -50,6 +50,50 @@ class RaidsMember:
     gold_looted: Optional[int] = None
 
 
+@dataclass(slots=True)
+class WarAttack:
+    attacker_tag: str
+    defender_tag: str
+    stars: int
+    destruction_percentage: int
+    order: int
+    previous_stars: int
+    new_stars: int
+    previous_attacks_count: int = 0
+
+
+@dataclass(slots=True)
+class WarAttackStats:
+    attacks_count: int = 0
+    new_stars: int = 0
+    triple_attempts: int = 0
+    triples: int = 0
+    cleanups: int = 0
+    successful_cleanups: int = 0
+
+
+@dataclass(slots=True)
+class WarViewMember:
+    player_tag: str
+    name: str
+    map_position: int
+    attacks: list[WarAttack]
+    best_opponent_attack: Optional[WarAttack]
+    attack_stats: WarAttackStats
+
+
+@dataclass(slots=True)
+class WarViewSide:
+    members: list[WarViewMember]
+    member_by_tag: dict[str, WarViewMember]
+
+
+@dataclass(slots=True)
+class WarView:
+    clan: WarViewSide
+    opponent: WarViewSide
+
+
 @dataclass
 class ClanWarLeagueWar:
     clan_tag: str
@@ -1 +1,4 @@
+from output_formatter.attack_timeline import AttackTimeline
+from output_formatter.hero_equipment_progress import HeroEquipmentProgress
 from output_formatter.output_formatter import OutputFormatter
+from output_formatter.render_cache import RenderCache
@@ -0,0 +1,54 @@
+from entities.game_entities import WarAttack, WarAttackStats
+
+
+class AttackTimeline:
+    def __init__(self, war_clan_members: list):
+        """
+        Attacks of one war side in the order they were made, with the state of each defender before every attack.
+        Attacks are sorted once, so the whole timeline is built in O(n log n) of the number of attacks.
+
+        An attack is a triple attempt if its defender had not been tripled before,
+        and a cleanup if its defender had already been attacked without being tripled.
+        """
+        attacks = sorted(
+            (attack for member in war_clan_members for attack in member.get('attacks', [])),
+            key=lambda attack: attack['order']
+        )
+        best_stars_by_defender = {}
+        attacks_count_by_defender = {}
+        self.attacks_by_order = {}
+        self.stats_by_attacker = {member['tag']: WarAttackStats() for member in war_clan_members}
+        for attack in attacks:
+            previous_stars = best_stars_by_defender.get(attack['defenderTag'], 0)
+            previous_attacks_count = attacks_count_by_defender.get(attack['defenderTag'], 0)
+            war_attack = self.to_war_attack(attack, previous_stars, previous_attacks_count)
+            self.attacks_by_order[war_attack.order] = war_attack
+            self.add_to_stats(self.stats_by_attacker.setdefault(war_attack.attacker_tag, WarAttackStats()), war_attack)
+            best_stars_by_defender[war_attack.defender_tag] = max(previous_stars, war_attack.stars)
+            attacks_count_by_defender[war_attack.defender_tag] = previous_attacks_count + 1
+
+    @staticmethod
+    def to_war_attack(attack: dict, previous_stars: int, previous_attacks_count: int = 0) -> WarAttack:
+        return WarAttack(
+            attacker_tag=attack['attackerTag'],
+            defender_tag=attack['defenderTag'],
+            stars=attack['stars'],
+            destruction_percentage=attack['destructionPercentage'],
+            order=attack['order'],
+            previous_stars=previous_stars,
+            new_stars=max(attack['stars'] - previous_stars, 0),
+            previous_attacks_count=previous_attacks_count
+        )
+
+    @staticmethod
+    def add_to_stats(stats: WarAttackStats, war_attack: WarAttack) -> None:
+        stats.attacks_count += 1
+        stats.new_stars += war_attack.new_stars
+        if war_attack.previous_stars < 3:
+            stats.triple_attempts += 1
+            if war_attack.stars == 3:
+                stats.triples += 1
+            if war_attack.previous_attacks_count > 0:
+                stats.cleanups += 1
+                if war_attack.stars == 3:
+                    stats.successful_cleanups += 1
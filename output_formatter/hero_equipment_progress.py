@@ -0,0 +1,86 @@
+from entities.game_entities import HeroEquipment
+
+
+class HeroEquipmentProgress:
+    REGULAR_EQUIPMENT_MAX_LEVEL = 18
+    EPIC_EQUIPMENT_MAX_LEVEL = 27
+    SHINY_ORE_CUMULATIVE_PRICE = (
+        0, 120, 360, 760, 1360, 2200, 3320, 4760, 6560,
+        8460, 10460, 12560, 14760, 17060, 19460, 21960, 24560, 27260,
+        30060, 32960, 35960, 39060, 42260, 45560, 48960, 52460, 56060
+    )
+    GLOWY_ORE_CUMULATIVE_PRICE = (
+        0, 0, 20, 20, 20, 120, 120, 120, 320,
+        320, 320, 720, 720, 720, 1320, 1320, 1320, 1920,
+        1920, 1920, 2520, 2520, 2520, 3120, 3120, 3120, 3720
+    )
+    STARRY_ORE_CUMULATIVE_PRICE = (
+        0, 0, 0, 0, 0, 0, 0, 0, 10,
+        10, 10, 30, 30, 30, 60, 60, 60, 110,
+        110, 110, 210, 210, 210, 330, 330, 330, 480
+    )
+
+    def __init__(self, available_hero_equipments: dict[str, HeroEquipment]):
+        """
+        Hero equipment progress of players, measured in levels and ore spent.
+        Ore spent up to every level is precomputed once, so progress of the whole clan is computed
+        with a single lookup per piece of equipment.
+        """
+        self.available_hero_equipment_names = frozenset(available_hero_equipments)
+        self.regular_progress_by_level = tuple(
+            (shiny_ore, glowy_ore, 0, level + 1)
+            for level, (shiny_ore, glowy_ore)
+            in enumerate(zip(self.SHINY_ORE_CUMULATIVE_PRICE, self.GLOWY_ORE_CUMULATIVE_PRICE))
+        )
+        self.epic_progress_by_level = tuple(
+            (shiny_ore, glowy_ore, starry_ore, level + 1)
+            for level, (shiny_ore, glowy_ore, starry_ore) in enumerate(zip(
+                self.SHINY_ORE_CUMULATIVE_PRICE, self.GLOWY_ORE_CUMULATIVE_PRICE, self.STARRY_ORE_CUMULATIVE_PRICE
+            ))
+        )
+        regular_equipment_amount = sum(
+            hero_equipment.max_level == self.REGULAR_EQUIPMENT_MAX_LEVEL
+            for hero_equipment in available_hero_equipments.values()
+        )
+        epic_equipment_amount = sum(
+            hero_equipment.max_level == self.EPIC_EQUIPMENT_MAX_LEVEL
+            for hero_equipment in available_hero_equipments.values()
+        )
+        regular_max_progress = self.regular_progress_by_level[self.REGULAR_EQUIPMENT_MAX_LEVEL - 1]
+        epic_max_progress = self.epic_progress_by_level[self.EPIC_EQUIPMENT_MAX_LEVEL - 1]
+        self.total_progress = tuple(
+            regular_progress * regular_equipment_amount + epic_progress * epic_equipment_amount
+            for regular_progress, epic_progress in zip(regular_max_progress, epic_max_progress)
+        )
+
+    def calculate(self, hero_equipments: list[dict]) -> tuple[int, int, int, int]:
+        shiny_ore_amount = glowy_ore_amount = starry_ore_amount = levels_amount = 0
+        for hero_equipment in hero_equipments:
+            if hero_equipment['name'] not in self.available_hero_equipment_names:
+                continue
+            if hero_equipment['maxLevel'] == self.EPIC_EQUIPMENT_MAX_LEVEL:
+                shiny_ore, glowy_ore, starry_ore, level = self.epic_progress_by_level[hero_equipment['level'] - 1]
+            else:
+                shiny_ore, glowy_ore, starry_ore, level = self.regular_progress_by_level[hero_equipment['level'] - 1]
+            shiny_ore_amount += shiny_ore
+            glowy_ore_amount += glowy_ore
+            starry_ore_amount += starry_ore
+            levels_amount += level
+        return shiny_ore_amount, glowy_ore_amount, starry_ore_amount, levels_amount
+
+    def calculate_percentages(self, hero_equipments: list[dict]) -> tuple[float, float, float, float]:
+        return self.to_percentages(self.calculate(hero_equipments))
+
+    def to_percentages(self, amounts: tuple[int, int, int, int]) -> tuple[float, float, float, float]:
+        return tuple(amount / total_amount for amount, total_amount in zip(amounts, self.total_progress))
+
+    def get_ore_costs(self) -> list[tuple[int, int, int, int, int]]:
+        return [
+            (self.REGULAR_EQUIPMENT_MAX_LEVEL, level, shiny_ore, glowy_ore, starry_ore)
+            for shiny_ore, glowy_ore, starry_ore, level
+            in self.regular_progress_by_level[:self.REGULAR_EQUIPMENT_MAX_LEVEL]
+        ] + [
+            (self.EPIC_EQUIPMENT_MAX_LEVEL, level, shiny_ore, glowy_ore, starry_ore)
+            for shiny_ore, glowy_ore, starry_ore, level
+            in self.epic_progress_by_level[:self.EPIC_EQUIPMENT_MAX_LEVEL]
+        ]
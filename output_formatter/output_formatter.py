@@ -5,7 +5,9 @@ from typing import Optional
 from asyncpg import Record
 
 from config import config
-from entities.game_entities import HeroEquipment, Hero
+from entities.game_entities import HeroEquipment, Hero, WarView, WarViewMember, WarViewSide
+from output_formatter.attack_timeline import AttackTimeline
+from output_formatter.hero_equipment_progress import HeroEquipmentProgress
 
 
 class Event(IntEnum):
@@ -22,6 +24,7 @@ class Event(IntEnum):
 class OutputFormatter:
     def __init__(self, utc_to_local_hours: Optional[timedelta] = timedelta(hours=3)):
         self.utc_to_local_hours = utc_to_local_hours
+        self.hero_equipment_progress = HeroEquipmentProgress(self.get_available_hero_equipments())
 
     @staticmethod
     def to_html(text: str) -> str:
@@ -517,7 +520,7 @@ class OutputFormatter:
             text += f'{self.war_log(clan_war_log)}'
         return text
 
-    def war_members(self, war_clan_members: list, clan_map_position_by_player: dict, rows: list[Record]) -> str:
+    def war_members(self, war_side: WarViewSide, rows: list[Record]) -> str:
         war_member_info = {
             row['player_tag']: (
                 f'{self.to_html(row['player_name'])} {self.get_player_info_with_emoji(
@@ -532,12 +535,10 @@ class OutputFormatter:
             )
             for row in rows
         }
-        war_member_lines = [''] * len(clan_map_position_by_player)
-        for member in war_clan_members:
-            war_member_lines[clan_map_position_by_player[member['tag']] - 1] = (
-                f'{clan_map_position_by_player[member['tag']]}. '
-                f'{war_member_info.get(member['tag'], self.to_html(member['name']))}'
-            )
+        war_member_lines = [
+            f'{member.map_position}. {war_member_info.get(member.player_tag, self.to_html(member.name))}'
+            for member in war_side.members
+        ]
         text = '\n'.join(war_member_lines)
         return text
 
@@ -762,141 +763,86 @@ class OutputFormatter:
         }
         return map_position
 
-    def get_map(
-            self,
-            clan_map_position_by_player: dict,
-            opponent_map_position_by_player: dict,
-            clan_data: dict,
-            opponent_data: dict
-    ) -> str:
-        clan_player_name_by_player_tag = {
-            clan_member['tag']: clan_member['name']
-            for clan_member
-            in clan_data['members']
-        }
-        opponent_member_lines = [''] * len(opponent_map_position_by_player)
-        for opponent_member in opponent_data['members']:
-            if opponent_member.get('bestOpponentAttack') is not None:
-                best_opponent_attack = opponent_member['bestOpponentAttack']
-                if best_opponent_attack['stars'] > 0:
-                    opponent_member_lines[opponent_map_position_by_player[opponent_member['tag']] - 1] += (
-                        f'{opponent_map_position_by_player[opponent_member['tag']]}. '
-                        f'{'⭐' * best_opponent_attack['stars']} '
-                        f'({best_opponent_attack['destructionPercentage']}%) '
-                        f'⬅️ '
-                        f'{clan_map_position_by_player[best_opponent_attack['attackerTag']]}. '
-                        f'{self.to_html(clan_player_name_by_player_tag[best_opponent_attack['attackerTag']])}'
-                    )
-                else:
-                    opponent_member_lines[opponent_map_position_by_player[opponent_member['tag']] - 1] += (
-                        f'{opponent_map_position_by_player[opponent_member['tag']]}. 0%'
-                    )
-            else:
-                opponent_member_lines[opponent_map_position_by_player[opponent_member['tag']] - 1] += (
-                    f'{opponent_map_position_by_player[opponent_member['tag']]}. 0%'
+    @staticmethod
+    def get_war_view(war: dict) -> WarView:
+        clan_timeline = AttackTimeline(war['clan']['members'])
+        opponent_timeline = AttackTimeline(war['opponent']['members'])
+        return WarView(
+            clan=OutputFormatter.get_war_view_side(war['clan']['members'], clan_timeline, opponent_timeline),
+            opponent=OutputFormatter.get_war_view_side(war['opponent']['members'], opponent_timeline, clan_timeline)
+        )
+
+    @staticmethod
+    def get_war_view_side(
+            war_clan_members: list, timeline: AttackTimeline, opponent_timeline: AttackTimeline
+    ) -> WarViewSide:
+        map_position_by_player = OutputFormatter.calculate_map_positions(war_clan_members)
+        members = []
+        for member in war_clan_members:
+            best_opponent_attack = member.get('bestOpponentAttack')
+            if best_opponent_attack is not None:
+                best_opponent_attack = (
+                    opponent_timeline.attacks_by_order.get(best_opponent_attack['order']) or
+                    AttackTimeline.to_war_attack(best_opponent_attack, 0)
                 )
+            members.append(WarViewMember(
+                player_tag=member['tag'],
+                name=member['name'],
+                map_position=map_position_by_player[member['tag']],
+                attacks=[timeline.attacks_by_order[attack['order']] for attack in member.get('attacks', [])],
+                best_opponent_attack=best_opponent_attack,
+                attack_stats=timeline.stats_by_attacker[member['tag']]
+            ))
+        members.sort(key=lambda _member: _member.map_position)
+        return WarViewSide(members=members, member_by_tag={member.player_tag: member for member in members})
+
+    def get_map(self, clan: WarViewSide, opponent: WarViewSide) -> str:
+        opponent_member_lines = []
+        for opponent_member in opponent.members:
+            best_opponent_attack = opponent_member.best_opponent_attack
+            if best_opponent_attack is not None and best_opponent_attack.stars > 0:
+                attacker = clan.member_by_tag[best_opponent_attack.attacker_tag]
+                opponent_member_lines.append(
+                    f'{opponent_member.map_position}. '
+                    f'{'⭐' * best_opponent_attack.stars} '
+                    f'({best_opponent_attack.destruction_percentage}%) '
+                    f'⬅️ '
+                    f'{attacker.map_position}. '
+                    f'{self.to_html(attacker.name)}'
+                )
+            else:
+                opponent_member_lines.append(f'{opponent_member.map_position}. 0%')
         return '\n'.join(opponent_member_lines)
 
-    def get_attacks(
-            self,
-            clan_map_position_by_player: dict,
-            opponent_map_position_by_player: dict,
-            clan_data: dict,
-            opponent_data: dict,
-            desired_attacks_spent: int
-    ) -> str:
-        opponent_player_name_by_player_tag = {
-            opponent_member['tag']: opponent_member['name']
-            for opponent_member
-            in opponent_data['members']
-        }
-        cw_member_lines = [''] * len(clan_map_position_by_player)
-        for member in clan_data['members']:
-            cw_member_lines[clan_map_position_by_player[member['tag']] - 1] += (
-                f'{clan_map_position_by_player[member['tag']]}. '
-                f'{self.to_html(member['name'])}: {len(member.get('attacks', []))} / {desired_attacks_spent}\n'
+    def get_attacks(self, clan: WarViewSide, opponent: WarViewSide, desired_attacks_spent: int) -> str:
+        cw_member_lines = []
+        for member in clan.members:
+            cw_member_line = (
+                f'{member.map_position}. '
+                f'{self.to_html(member.name)}: {len(member.attacks)} / {desired_attacks_spent}\n'
             )
-            for attack in member.get('attacks', []):
-                if attack['stars'] != 0:
-                    cw_member_lines[clan_map_position_by_player[member['tag']] - 1] += (
-                        f'{'⭐' * attack['stars']} ({attack['destructionPercentage']}%) '
-                        f'➡️ {opponent_map_position_by_player[attack['defenderTag']]}. '
-                        f'{self.to_html(opponent_player_name_by_player_tag[attack['defenderTag']])}\n'
+            for attack in member.attacks:
+                defender = opponent.member_by_tag[attack.defender_tag]
+                if attack.stars != 0:
+                    cw_member_line += (
+                        f'{'⭐' * attack.stars} ({attack.destruction_percentage}%) '
+                        f'➡️ {defender.map_position}. '
+                        f'{self.to_html(defender.name)}\n'
                     )
                 else:
-                    cw_member_lines[clan_map_position_by_player[member['tag']] - 1] += (
-                        f'{attack['destructionPercentage']}% '
-                        f'➡️ {opponent_map_position_by_player[attack['defenderTag']]}. '
-                        f'{self.to_html(opponent_player_name_by_player_tag[attack['defenderTag']])}\n'
+                    cw_member_line += (
+                        f'{attack.destruction_percentage}% '
+                        f'➡️ {defender.map_position}. '
+                        f'{self.to_html(defender.name)}\n'
                     )
+            cw_member_lines.append(cw_member_line)
         return '\n'.join(cw_member_lines)
 
-    @staticmethod
-    async def calculate_hero_equipment_progress(hero_equipments: list, return_percentage: bool) -> tuple:
-        regular_equipment_max_level = 18
-        epic_equipment_max_level = 27
-        available_hero_equipments = OutputFormatter.get_available_hero_equipments()
-        regular_equipment_amount = sum(
-            hero_equipment.max_level == regular_equipment_max_level
-            for hero_equipment in available_hero_equipments.values()
-        )
-        epic_equipment_amount = sum(
-            hero_equipment.max_level == epic_equipment_max_level
-            for hero_equipment in available_hero_equipments.values()
-        )
-        shiny_ore_cumulative_price = [
-            0, 120, 360, 760, 1360, 2200, 3320, 4760, 6560,
-            8460, 10460, 12560, 14760, 17060, 19460, 21960, 24560, 27260,
-            30060, 32960, 35960, 39060, 42260, 45560, 48960, 52460, 56060
-        ]
-        glowy_ore_cumulative_price = [
-            0, 0, 20, 20, 20, 120, 120, 120, 320,
-            320, 320, 720, 720, 720, 1320, 1320, 1320, 1920,
-            1920, 1920, 2520, 2520, 2520, 3120, 3120, 3120, 3720
-        ]
-        starry_ore_cumulative_price = [
-            0, 0, 0, 0, 0, 0, 0, 0, 10,
-            10, 10, 30, 30, 30, 60, 60, 60, 110,
-            110, 110, 210, 210, 210, 330, 330, 330, 480
-        ]
-        shiny_ore_amount = 0
-        glowy_ore_amount = 0
-        starry_ore_amount = 0
-        levels_amount = 0
-        total_shiny_ore_amount = (
-                shiny_ore_cumulative_price[regular_equipment_max_level - 1] * regular_equipment_amount +
-                shiny_ore_cumulative_price[epic_equipment_max_level - 1] * epic_equipment_amount
-        )
-        total_glowy_ore_amount = (
-                glowy_ore_cumulative_price[regular_equipment_max_level - 1] * regular_equipment_amount +
-                glowy_ore_cumulative_price[epic_equipment_max_level - 1] * epic_equipment_amount
-        )
-        total_starry_ore_amount = (
-                starry_ore_cumulative_price[epic_equipment_max_level - 1] * epic_equipment_amount
-        )
-        total_levels_amount = (
-                regular_equipment_max_level * regular_equipment_amount +
-                epic_equipment_max_level * epic_equipment_amount
-        )
-        for hero_equipment in hero_equipments:
-            if hero_equipment['name'] in available_hero_equipments:
-                shiny_ore_amount += shiny_ore_cumulative_price[hero_equipment['level'] - 1]
-                glowy_ore_amount += glowy_ore_cumulative_price[hero_equipment['level'] - 1]
-                if hero_equipment['maxLevel'] == 27:
-                    starry_ore_amount += starry_ore_cumulative_price[hero_equipment['level'] - 1]
-                levels_amount += hero_equipment['level']
+    async def calculate_hero_equipment_progress(self, hero_equipments: list, return_percentage: bool) -> tuple:
         if return_percentage:
-            return (
-                shiny_ore_amount / total_shiny_ore_amount,
-                glowy_ore_amount / total_glowy_ore_amount,
-                starry_ore_amount / total_starry_ore_amount,
-                levels_amount / total_levels_amount
-            )
+            return self.hero_equipment_progress.calculate_percentages(hero_equipments)
         else:
-            return (
-                shiny_ore_amount, glowy_ore_amount, starry_ore_amount, levels_amount,
-                total_shiny_ore_amount, total_glowy_ore_amount, total_starry_ore_amount, total_levels_amount
-            )
+            return self.hero_equipment_progress.calculate(hero_equipments) + self.hero_equipment_progress.total_progress
 
     @staticmethod
     def get_available_hero_equipments() -> dict[str, HeroEquipment]:
@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Any
+
+from aiogram.enums import ParseMode
+from aiogram.types import InlineKeyboardMarkup
+
+
+class RenderCache:
+    def __init__(self, max_size: int = 4 * 1024 * 1024, ttl_seconds: float = 60):
+        """
+        An LRU cache of rendered messages
+
+        :param max_size: approximate number of bytes all cached messages may take
+        :param ttl_seconds: number of seconds a message is cached for, which bounds staleness of data
+            that is not covered by the cache key, such as player names
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get(self, key: Any) -> Optional[tuple[str, ParseMode, Optional[InlineKeyboardMarkup]]]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self.remove(key)
+            self.miss_count += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hit_count += 1
+        return entry[2]
+
+    def set(self, key: Any, rendered: tuple[str, ParseMode, Optional[InlineKeyboardMarkup]]) -> None:
+        text, _, reply_markup = rendered
+        size = len(text.encode('utf-8')) + (len(reply_markup.model_dump_json()) if reply_markup is not None else 0)
+        if size > self.max_size:
+            return
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, size, rendered)
+        self.size += size
+        while self.size > self.max_size:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key: Any) -> None:
+        _, size, _ = self.entries.pop(key)
+        self.size -= size
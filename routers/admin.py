@@ -1,10 +1,8 @@
-from contextlib import suppress
 from enum import auto, IntEnum
 from typing import Optional
 
 from aiogram import Router
 from aiogram.enums import ParseMode, ChatType
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message, CallbackQuery
@@ -848,8 +846,7 @@ async def callback_admin(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await admin(can_user_edit_cw_list, can_user_link_members)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -867,8 +864,7 @@ async def callback_link_select_chat(
         text, parse_mode, reply_markup = await link_select_chat(
             dm, callback_data, callback_query.message.chat.id, callback_query.from_user.id
         )
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -889,8 +885,7 @@ async def callback_link_select_player(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await link_select_player(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -911,8 +906,7 @@ async def callback_link_select_user(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await link_select_user(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -928,8 +922,7 @@ async def callback_link_finish(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await link_finish(dm, callback_data, callback_query)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -949,8 +942,7 @@ async def callback_unlink_select_chat(
         text, parse_mode, reply_markup = await unlink_select_chat(
             dm, callback_data, callback_query.message.chat.id, callback_query.from_user.id
         )
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -968,8 +960,7 @@ async def callback_unlink_select_player(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await unlink_select_player(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -987,8 +978,7 @@ async def callback_unlink_select_user(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await unlink_select_user(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -1004,8 +994,7 @@ async def callback_unlink_finish(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await unlink_finish(dm, callback_data, callback_query)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -1019,8 +1008,7 @@ async def callback_edit_cw_list(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await edit_cw_list(dm, callback_query, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -1034,8 +1022,7 @@ async def callback_edit_cwl_list(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await edit_cwl_list(dm, callback_query, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -1051,8 +1038,7 @@ async def callback_give_bonus_select_player(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await give_bonus_select_player(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -1068,8 +1054,7 @@ async def callback_give_bonus_set_points(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await give_bonus_set_points(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
@@ -1085,8 +1070,7 @@ async def callback_give_bonus_finish(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await give_bonus_finish(dm, callback_query, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         await callback_query.answer()
 
 
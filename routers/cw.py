@@ -1,10 +1,8 @@
-from contextlib import suppress
 from enum import auto, IntEnum
 from typing import Optional
 
 from aiogram import Router
 from aiogram.enums import ParseMode, ChatType
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import CallbackQuery, Message, InlineKeyboardButton, InlineKeyboardMarkup
@@ -151,28 +149,24 @@ async def cw_map(
         )
         button_row.append(update_button)
     elif dm.of.state(cw) in ['inWar', 'warEnded']:
-        clan_map_position_by_player = {member['tag']: member['mapPosition'] for member in cw['clan']['members']}
-        opponent_map_position_by_player = {member['tag']: member['mapPosition'] for member in cw['opponent']['members']}
+        war_view = dm.get_war_view(cw)
         text += (
             f'{dm.of.cw_in_war_or_war_ended(cw, False, None, None)}'
             f'\n'
         )
         if cw_map_side == CWMapSide.opponent:
             text += 'Карта противника:\n'
-            text += dm.of.get_map(
-                clan_map_position_by_player, opponent_map_position_by_player, cw['clan'], cw['opponent']
-            )
+            text += dm.of.get_map(war_view.clan, war_view.opponent)
             button_row.append(clan_side_button)
             if show_skips:
-                cw_members = []
-                for cw_member in cw['clan']['members']:
-                    cw_members.append(
-                        WarMember(
-                            player_tag=cw_member['tag'],
-                            attacks_spent=len(cw_member.get('attacks', [])),
-                            attacks_limit=cw['attacksPerMember']
-                        )
+                cw_members = [
+                    WarMember(
+                        player_tag=cw_member.player_tag,
+                        attacks_spent=len(cw_member.attacks),
+                        attacks_limit=cw['attacksPerMember']
                     )
+                    for cw_member in war_view.clan.members
+                ]
                 text += (
                     f'\n'
                     f'\n'
@@ -190,9 +184,7 @@ async def cw_map(
                 button_row.append(show_skips_button)
         else:
             text += 'Карта клана:\n'
-            text += dm.of.get_map(
-                opponent_map_position_by_player, clan_map_position_by_player, cw['opponent'], cw['clan']
-            )
+            text += dm.of.get_map(war_view.opponent, war_view.clan)
             button_row.append(opponent_side_button)
 
         button_row.append(update_button)
@@ -243,12 +235,11 @@ async def cw_attacks(
                 FROM player
                 WHERE clan_tag = $1
             ''', dm.clan_tag)
-            clan_map_position_by_player = {member['tag']: member['mapPosition'] for member in cw['clan']['members']}
             text += (
                 f'{dm.of.cw_preparation(cw, False, None, None)}'
                 f'\n'
                 f'Список участников КВ клана:\n'
-                f'{dm.of.war_members(cw['clan']['members'], clan_map_position_by_player, rows)}'
+                f'{dm.of.war_members(dm.get_war_view(cw).clan, rows)}'
             )
             button_row.append(opponent_attacks_button)
         else:
@@ -259,20 +250,16 @@ async def cw_attacks(
                 FROM opponent_player
                 WHERE clan_tag = $1
             ''', cw['opponent']['tag'])
-            opponent_map_position_by_player = {
-                member['tag']: member['mapPosition'] for member in cw['opponent']['members']
-            }
             text += (
                 f'{dm.of.cw_preparation(cw, False, None, None)}'
                 f'\n'
                 f'Список участников КВ противника:\n'
-                f'{dm.of.war_members(cw['opponent']['members'], opponent_map_position_by_player, rows)}'
+                f'{dm.of.war_members(dm.get_war_view(cw).opponent, rows)}'
             )
             button_row.append(clan_attacks_button)
         button_row.append(update_button)
     elif dm.of.state(cw) in ['inWar', 'warEnded']:
-        clan_map_position_by_player = {member['tag']: member['mapPosition'] for member in cw['clan']['members']}
-        opponent_map_position_by_player = {member['tag']: member['mapPosition'] for member in cw['opponent']['members']}
+        war_view = dm.get_war_view(cw)
         text += (
             f'{dm.of.cw_in_war_or_war_ended(cw, False, None, None)}'
             f'\n'
@@ -281,18 +268,14 @@ async def cw_attacks(
             text += (
                 f'Атаки клана:\n'
                 f'\n'
-                f'{dm.of.get_attacks(
-                clan_map_position_by_player, opponent_map_position_by_player, cw['clan'], cw['opponent'], cw['attacksPerMember']
-                )}'
+                f'{dm.of.get_attacks(war_view.clan, war_view.opponent, cw['attacksPerMember'])}'
             )
             button_row.append(opponent_attacks_button)
         else:
             text += (
                 f'Атаки противника:\n'
                 f'\n'
-                f'{dm.of.get_attacks(
-                opponent_map_position_by_player, clan_map_position_by_player, cw['opponent'], cw['clan'], cw['attacksPerMember']
-                )}'
+                f'{dm.of.get_attacks(war_view.opponent, war_view.clan, cw['attacksPerMember'])}'
             )
             button_row.append(clan_attacks_button)
         button_row.append(update_button)
@@ -313,20 +296,11 @@ async def cw_skips(dm: DatabaseManager, chat_id: int) -> tuple[str, ParseMode, O
         text='🔄 Обновить',
         callback_data=CWCallbackFactory(output_view=OutputView.cw_skips, update=True).pack()
     )
-    cw = await dm.load_clan_war()
+    cw, cw_members = await dm.load_clan_war_members()
     if dm.of.state(cw) in ['preparation']:
         text += dm.of.cw_preparation(cw, False, None, None)
         button_row.append(update_button)
     elif dm.of.state(cw) in ['inWar', 'warEnded']:
-        cw_members = []
-        for cw_member in cw['clan']['members']:
-            cw_members.append(
-                WarMember(
-                    player_tag=cw_member['tag'],
-                    attacks_spent=len(cw_member.get('attacks', [])),
-                    attacks_limit=cw['attacksPerMember']
-                )
-            )
         text += (
             f'{dm.of.cw_in_war_or_war_ended(cw, False, None, None)}'
             f'\n'
@@ -350,19 +324,10 @@ async def cw_ping(dm: DatabaseManager, chat_id: int) -> tuple[str, ParseMode, Op
         f'<b>🔔 Напоминание об атаках в КВ</b>\n'
         f'\n'
     )
-    cw = await dm.load_clan_war()
+    cw, cw_members = await dm.load_clan_war_members()
     if dm.of.state(cw) in ['preparation']:
         text += dm.of.cw_preparation(cw, False, None, None)
     elif dm.of.state(cw) in ['inWar', 'warEnded']:
-        cw_members = []
-        for cw_member in cw['clan']['members']:
-            cw_members.append(
-                WarMember(
-                    player_tag=cw_member['tag'],
-                    attacks_spent=len(cw_member.get('attacks', [])),
-                    attacks_limit=cw['attacksPerMember']
-                )
-            )
         text += (
             f'{dm.of.cw_in_war_or_war_ended(cw, False, None, None)}'
             f'\n'
@@ -601,8 +566,7 @@ async def callback_cw_info(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cw_info(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -626,9 +590,11 @@ async def callback_cw_map(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         chat_id = await dm.get_group_chat_id(callback_query.message)
-        text, parse_mode, reply_markup = await cw_map(dm, callback_data, chat_id)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        text, parse_mode, reply_markup = await dm.render(
+            (callback_data.model_copy(update={'update': False}).pack(), chat_id), ['clan_war'],
+            lambda: cw_map(dm, callback_data, chat_id)
+        )
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -650,9 +616,11 @@ async def callback_cw_attacks(
     if not user_is_message_owner:
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
-        text, parse_mode, reply_markup = await cw_attacks(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        text, parse_mode, reply_markup = await dm.render(
+            callback_data.model_copy(update={'update': False}).pack(), ['clan_war'],
+            lambda: cw_attacks(dm, callback_data)
+        )
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -677,8 +645,7 @@ async def callback_cw_skips(
     else:
         chat_id = await dm.get_group_chat_id(callback_query.message)
         text, parse_mode, reply_markup = await cw_skips(dm, chat_id)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -720,8 +687,7 @@ async def callback_cw_status(
     else:
         bot_user = await dm.get_message_owner(callback_query.message)
         text, parse_mode, reply_markup = await cw_status(dm, callback_data, bot_user, chat_id)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -744,8 +710,7 @@ async def callback_cw_list(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cw_list(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -1,10 +1,8 @@
-from contextlib import suppress
 from enum import auto, IntEnum
 from typing import Optional
 
 from aiogram import Router
 from aiogram.enums import ParseMode, ChatType
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import CallbackQuery, Message, InlineKeyboardButton, InlineKeyboardMarkup
@@ -205,26 +203,20 @@ async def cwl_map(
         text += dm.of.cwlw_preparation(cwlw, cwl_season, cwl_day, False, None, None)
         button_upper_row.append(update_button)
     elif dm.of.state(cwlw) in ['inWar', 'warEnded']:
-        clan_map_position_by_player = dm.of.calculate_map_positions(cwlw['clan']['members'])
-        opponent_map_position_by_player = dm.of.calculate_map_positions(cwlw['opponent']['members'])
+        war_view = dm.get_war_view(cwlw)
         text += (
             f'{dm.of.cwlw_in_war_or_war_ended(cwlw, cwl_season, cwl_day, False, None, None)}'
             f'\n'
         )
         if cwl_map_side == CWLMapSide.opponent:
             text += 'Карта противника:\n'
-            text += dm.of.get_map(
-                clan_map_position_by_player, opponent_map_position_by_player, cwlw['clan'], cwlw['opponent']
-            )
+            text += dm.of.get_map(war_view.clan, war_view.opponent)
             button_upper_row.append(clan_side_button)
             if show_skips:
-                cwlw_members = []
-                for cwlw_member in cwlw['clan']['members']:
-                    cwlw_members.append(
-                        WarMember(
-                            player_tag=cwlw_member['tag'], attacks_spent=len(cwlw_member.get('attacks', [])), attacks_limit=1
-                        )
-                    )
+                cwlw_members = [
+                    WarMember(player_tag=cwlw_member.player_tag, attacks_spent=len(cwlw_member.attacks), attacks_limit=1)
+                    for cwlw_member in war_view.clan.members
+                ]
                 text += (
                     f'\n'
                     f'\n'
@@ -237,9 +229,7 @@ async def cwl_map(
                 button_upper_row.append(show_skips_button)
         else:
             text += 'Карта клана:\n'
-            text += dm.of.get_map(
-                opponent_map_position_by_player, clan_map_position_by_player, cwlw['opponent'], cwlw['clan']
-            )
+            text += dm.of.get_map(war_view.opponent, war_view.clan)
             button_upper_row.append(opponent_side_button)
         button_upper_row.append(update_button)
     else:
@@ -326,12 +316,11 @@ async def cwl_attacks(
                 FROM player
                 WHERE clan_tag = $1
             ''', dm.clan_tag)
-            clan_map_position_by_player = dm.of.calculate_map_positions(cwlw['clan']['members'])
             text += (
                 f'{dm.of.cwlw_preparation(cwlw, cwl_season, cwl_day, False, None, None)}'
                 f'\n'
                 f'Список участников дня ЛВК клана:\n'
-                f'{dm.of.war_members(cwlw['clan']['members'], clan_map_position_by_player, rows)}'
+                f'{dm.of.war_members(dm.get_war_view(cwlw).clan, rows)}'
             )
             button_upper_row.append(opponent_attacks_button)
         else:
@@ -342,18 +331,16 @@ async def cwl_attacks(
                 FROM opponent_player
                 WHERE clan_tag = $1
             ''', cwlw['opponent']['tag'])
-            opponent_map_position_by_player = dm.of.calculate_map_positions(cwlw['opponent']['members'])
             text += (
                 f'{dm.of.cwlw_preparation(cwlw, cwl_season, cwl_day, False, None, None)}'
                 f'\n'
                 f'Список участников дня ЛВК противника:\n'
-                f'{dm.of.war_members(cwlw['opponent']['members'], opponent_map_position_by_player, rows)}'
+                f'{dm.of.war_members(dm.get_war_view(cwlw).opponent, rows)}'
             )
             button_upper_row.append(clan_attacks_button)
         button_upper_row.append(update_button)
     elif dm.of.state(cwlw) in ['inWar', 'warEnded']:
-        clan_map_position_by_player = dm.of.calculate_map_positions(cwlw['clan']['members'])
-        opponent_map_position_by_player = dm.of.calculate_map_positions(cwlw['opponent']['members'])
+        war_view = dm.get_war_view(cwlw)
         text += (
             f'{dm.of.cwlw_in_war_or_war_ended(cwlw, cwl_season, cwl_day, False, None, None)}'
             f'\n'
@@ -362,18 +349,14 @@ async def cwl_attacks(
             text += (
                 f'Атаки клана:\n'
                 f'\n'
-                f'{dm.of.get_attacks(
-                    clan_map_position_by_player, opponent_map_position_by_player, cwlw['clan'], cwlw['opponent'], 1
-                )}'
+                f'{dm.of.get_attacks(war_view.clan, war_view.opponent, 1)}'
             )
             button_upper_row.append(opponent_attacks_button)
         else:
             text += (
                 f'Атаки противника:\n'
                 f'\n'
-                f'{dm.of.get_attacks(
-                    opponent_map_position_by_player, clan_map_position_by_player, cwlw['opponent'], cwlw['clan'], 1
-                )}'
+                f'{dm.of.get_attacks(war_view.opponent, war_view.clan, 1)}'
             )
             button_upper_row.append(clan_attacks_button)
         button_upper_row.append(update_button)
@@ -934,8 +917,7 @@ async def callback_cwl_info(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_info(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -959,9 +941,12 @@ async def callback_cwl_map(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         chat_id = await dm.get_group_chat_id(callback_query.message)
-        text, parse_mode, reply_markup = await cwl_map(dm, callback_data, chat_id)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        text, parse_mode, reply_markup = await dm.render(
+            (callback_data.model_copy(update={'update': False}).pack(), chat_id),
+            ['clan_war_league', 'clan_war_league_own_wars'],
+            lambda: cwl_map(dm, callback_data, chat_id)
+        )
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -983,9 +968,12 @@ async def callback_cwl_attacks(
     if not user_is_message_owner:
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
-        text, parse_mode, reply_markup = await cwl_attacks(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        text, parse_mode, reply_markup = await dm.render(
+            callback_data.model_copy(update={'update': False}).pack(),
+            ['clan_war_league', 'clan_war_league_own_wars'],
+            lambda: cwl_attacks(dm, callback_data)
+        )
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -1010,8 +998,7 @@ async def callback_cwl_skips(
     else:
         chat_id = await dm.get_group_chat_id(callback_query.message)
         text, parse_mode, reply_markup = await cwl_skips(dm, chat_id, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -1030,8 +1017,7 @@ async def callback_cwl_all_days_list(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_days_list(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -1054,8 +1040,7 @@ async def callback_cwl_rating_list(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_rating_list(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -1071,8 +1056,7 @@ async def callback_cwl_rating_choose(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_rating_choose(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -1088,8 +1072,7 @@ async def callback_cwl_rating_details(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_rating_details(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -1105,8 +1088,7 @@ async def callback_cwl_rating_rules(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_rating_rules(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
@@ -1142,8 +1124,7 @@ async def callback_cwl_list(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_list(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -1166,8 +1147,7 @@ async def callback_cwl_clans(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await cwl_clans(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
     if callback_data.update:
         await callback_query.answer('Сообщение обновлено')
     else:
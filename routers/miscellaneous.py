@@ -1,11 +1,8 @@
-import json
-from contextlib import suppress
 from enum import auto, IntEnum
 from typing import Optional
 
 from aiogram import Router
 from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import Message, InlineKeyboardMarkup, CallbackQuery, InlineKeyboardButton
@@ -435,18 +432,9 @@ async def hero_equipment_list(
         f'<b>🔧 Снаряжения героев игроков ({hero_equipment_list_order_text(list_order, False)})</b>\n'
         f'\n'
     )
-    rows = await dm.acquired_connection.fetch('''
-        SELECT player_tag, hero_equipment
-        FROM player
-        WHERE clan_tag = $1 AND is_player_in_clan
-    ''', dm.clan_tag)
     equipments_by_levels = [
-        (
-            row['player_tag'], (await dm.of.calculate_hero_equipment_progress(json.loads(row['hero_equipment']), True))[
-                hero_equipment_order_idx(list_order)
-            ]
-        )
-        for row in rows
+        (player_tag, progress[hero_equipment_order_idx(list_order)])
+        for player_tag, progress in (await dm.load_hero_equipment_progress()).items()
     ]
     for i, (player_tag, level_progress) in enumerate(sorted(equipments_by_levels, key=lambda item: item[1], reverse=True)):
         text += f'{i + 1}. {dm.of.to_html(dm.load_name(player_tag))}: {format(level_progress * 100, '.2f')}%\n'
@@ -489,19 +477,9 @@ async def hero_equipment_choose(
         f'\n'
         f'Выберите игрока:'
     )
-    rows = await dm.acquired_connection.fetch('''
-        SELECT player_tag, hero_equipment
-        FROM player
-        WHERE clan_tag = $1 AND is_player_in_clan
-    ''', dm.clan_tag)
     equipments_by_levels = [
-        (
-            row['player_tag'],
-            (await dm.of.calculate_hero_equipment_progress(json.loads(row['hero_equipment']), True))[
-                hero_equipment_order_idx(list_order)
-            ]
-        )
-        for row in rows
+        (player_tag, progress[hero_equipment_order_idx(list_order)])
+        for player_tag, progress in (await dm.load_hero_equipment_progress()).items()
     ]
     button_rows = [[
         InlineKeyboardButton(
@@ -550,12 +528,7 @@ async def hero_equipment_details(
         Hero.royal_champion: f'{dm.of.get_royal_champion_emoji()} Королевский чемпион',
         Hero.dragon_duke: f'{dm.of.get_dragon_duke_emoji()} Герцог Дракон'
     }
-    hero_equipments = await dm.acquired_connection.fetchval('''
-        SELECT hero_equipment
-        FROM player
-        WHERE (clan_tag, player_tag) = ($1, $2)
-    ''', dm.clan_tag, callback_data.player_tag)
-    hero_equipments = json.loads(hero_equipments)
+    hero_equipments = await dm.load_player_hero_equipments(callback_data.player_tag)
     player_hero_equipments = {eq['name']: eq['level'] for eq in hero_equipments}
     (shiny_ore_amount,
      glowy_ore_amount,
@@ -887,8 +860,7 @@ async def callback_player_info(
     else:
         chat_id = await dm.get_group_chat_id(callback_query.message)
         text, parse_mode, reply_markup = await player_info(dm, BotUser(chat_id, callback_data.user_id))
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -915,8 +887,7 @@ async def callback_members(
             text, parse_mode, reply_markup = await members_users(dm, chat_id)
         else:
             text, parse_mode, reply_markup = await members_players(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -944,8 +915,7 @@ async def callback_hero_equipment(
             text, parse_mode, reply_markup = await hero_equipment_choose(dm, callback_data)
         else:
             text, parse_mode, reply_markup = await hero_equipment_list(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -968,8 +938,7 @@ async def callback_contributions(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await contributions(dm, callback_data)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -994,8 +963,7 @@ async def callback_donations(
     else:
         chat_id = await dm.get_group_chat_id(callback_query.message)
         text, parse_mode, reply_markup = await donations(dm, chat_id)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -1018,8 +986,7 @@ async def callback_events(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await events(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -1042,8 +1009,7 @@ async def callback_help(
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
         text, parse_mode, reply_markup = await help_(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
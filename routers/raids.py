@@ -1,10 +1,8 @@
-from contextlib import suppress
 from enum import auto, IntEnum
 from typing import Optional
 
 from aiogram import Router
 from aiogram.enums import ParseMode, ChatType
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
@@ -121,17 +119,8 @@ async def raids_skips(dm: DatabaseManager, chat_id: int) -> tuple[str, ParseMode
         text='🔄 Обновить',
         callback_data=RaidsCallbackFactory(output_view=OutputView.raids_skips, update=True).pack()
     )
-    raids = await dm.load_raid_weekend()
+    raids, raids_members = await dm.load_raid_weekend_members()
     if dm.of.state(raids) in ['ongoing', 'ended']:
-        raids_members = []
-        for raids_member in raids['members']:
-            raids_members.append(
-                RaidsMember(
-                    player_tag=raids_member['tag'],
-                    attacks_spent=raids_member['attacks'],
-                    attacks_limit=raids_member['attackLimit'] + raids_member['bonusAttackLimit']
-                )
-            )
         rows = await dm.acquired_connection.fetch('''
             SELECT player_tag
             FROM player
@@ -165,17 +154,8 @@ async def raids_ping(dm: DatabaseManager, chat_id: int) -> tuple[str, ParseMode,
         f'<b>🔔 Напоминание об атаках в рейдах</b>\n'
         f'\n'
     )
-    raids = await dm.load_raid_weekend()
+    raids, raids_members = await dm.load_raid_weekend_members()
     if dm.of.state(raids) in ['ongoing', 'ended']:
-        raids_members = []
-        for raids_member in raids['members']:
-            raids_members.append(
-                RaidsMember(
-                    player_tag=raids_member['tag'],
-                    attacks_spent=raids_member['attacks'],
-                    attacks_limit=raids_member['attackLimit'] + raids_member['bonusAttackLimit']
-                )
-            )
         rows = await dm.acquired_connection.fetch('''
             SELECT player_tag
             FROM player
@@ -299,9 +279,11 @@ async def callback_raids_info(
     if not user_is_message_owner:
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
-        text, parse_mode, reply_markup = await raids_info(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        text, parse_mode, reply_markup = await dm.render(
+            callback_data.model_copy(update={'update': False}).pack(), ['raid_weekend'],
+            lambda: raids_info(dm)
+        )
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -323,9 +305,11 @@ async def callback_raids_attacks(
     if not user_is_message_owner:
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
-        text, parse_mode, reply_markup = await raids_attacks(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        text, parse_mode, reply_markup = await dm.render(
+            callback_data.model_copy(update={'update': False}).pack(), ['raid_weekend'],
+            lambda: raids_attacks(dm)
+        )
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -350,8 +334,7 @@ async def callback_raids_skips(
     else:
         chat_id = await dm.get_group_chat_id(callback_query.message)
         text, parse_mode, reply_markup = await raids_skips(dm, chat_id)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else:
@@ -386,9 +369,11 @@ async def callback_raids_analysis(
     if not user_is_message_owner:
         await callback_query.answer('Эта кнопка не работает для вас')
     else:
-        text, parse_mode, reply_markup = await raids_analysis(dm)
-        with suppress(TelegramBadRequest):
-            await callback_query.message.edit_text(text=text, parse_mode=parse_mode, reply_markup=reply_markup)
+        text, parse_mode, reply_markup = await dm.render(
+            callback_data.model_copy(update={'update': False}).pack(), ['raid_weekend'],
+            lambda: raids_analysis(dm)
+        )
+        await dm.edit_message(callback_query.message, text=text, parse_mode=parse_mode, reply_markup=reply_markup)
         if callback_data.update:
             await callback_query.answer('Сообщение обновлено')
         else: